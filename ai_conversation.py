@@ -6,6 +6,8 @@ Uses Anthropic Claude for realistic medical conversations
 import os
 import json
 from anthropic import Anthropic
+from tracing import span
+from degradation import get_degradation_stats
 
 class AIConversation:
     def __init__(self):
@@ -69,8 +71,34 @@ Guidelines:
 - Do NOT use medical terminology unless you would realistically know it
 """
 
-    def generate_interviewer_response(self, conversation_history, patient, condition):
-        """Generate clinical interviewer's next question/response"""
+    def _complete(self, stage, system_prompt, messages, max_tokens, deadline, fallback):
+        """
+        Runs one Claude request, bound by `deadline` (a cancellation.Deadline, or None).
+        Returns (text, degraded): `fallback` with degraded=True if the call failed or could
+        not finish in time, which is counted as a degradation of `stage`.
+        """
+        try:
+            if deadline is not None and deadline.expired:
+                raise TimeoutError("turn deadline passed")
+            request_options = {"timeout": deadline.remaining()} if deadline is not None else {}
+            with span(f"claude.{stage}"):
+                response = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    system=system_prompt,
+                    messages=messages,
+                    **request_options
+                )
+            return response.content[0].text, False
+        except Exception as e:
+            print(f"Error generating {stage} response: {e}")
+            # A timeout during the call counts as a late call as well as one never started.
+            late = deadline is not None and deadline.expired
+            get_degradation_stats().record(stage, "deadline_fallback" if late else "error_fallback")
+            return fallback, True
+
+    def generate_interviewer_response(self, conversation_history, patient, condition, deadline=None):
+        """Generate clinical interviewer's next question/response. Returns (text, degraded)."""
         system_prompt = self.create_interviewer_prompt(patient, condition)
         
         messages = []
@@ -78,20 +106,11 @@ Guidelines:
             role = "assistant" if msg['role'] == 'interviewer' else "user"
             messages.append({"role": role, "content": msg['content']})
         
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=300,
-                system=system_prompt,
-                messages=messages
-            )
-            return response.content[0].text
-        except Exception as e:
-            print(f"Error generating interviewer response: {e}")
-            return "I apologize, but I'm having trouble processing that. Could you tell me more about your symptoms?"
+        return self._complete("interviewer", system_prompt, messages, 300, deadline,
+                              "I apologize, but I'm having trouble processing that. Could you tell me more about your symptoms?")
     
-    def generate_patient_response(self, conversation_history, patient, condition):
-        """Generate patient's response to interviewer's question"""
+    def generate_patient_response(self, conversation_history, patient, condition, deadline=None):
+        """Generate patient's response to interviewer's question. Returns (text, degraded)."""
         system_prompt = self.create_patient_prompt(patient, condition)
         
         messages = []
@@ -99,17 +118,8 @@ Guidelines:
             role = "user" if msg['role'] == 'interviewer' else "assistant"
             messages.append({"role": role, "content": msg['content']})
         
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=200,
-                system=system_prompt,
-                messages=messages
-            )
-            return response.content[0].text
-        except Exception as e:
-            print(f"Error generating patient response: {e}")
-            return "I'm not sure how to describe it exactly..."
+        return self._complete("patient", system_prompt, messages, 200, deadline,
+                              "I'm not sure how to describe it exactly...")
     
     def evaluate_report(self, report_text, patient, condition):
         """Evaluate the quality of the generated report"""
@@ -136,11 +146,12 @@ For each category, provide:
 Keep your evaluation constructive and educational."""
 
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1000,
-                messages=[{"role": "user", "content": evaluation_prompt}]
-            )
+            with span("claude.evaluate_report"):
+                response = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=1000,
+                    messages=[{"role": "user", "content": evaluation_prompt}]
+                )
             return response.content[0].text
         except Exception as e:
             print(f"Error evaluating report: {e}")
@@ -187,11 +198,12 @@ Generate a professional medical report with these sections:
 Use proper medical terminology and formatting. Be thorough but concise."""
 
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1500,
-                messages=[{"role": "user", "content": report_prompt}]
-            )
+            with span("claude.report"):
+                response = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=1500,
+                    messages=[{"role": "user", "content": report_prompt}]
+                )
             return response.content[0].text
         except Exception as e:
             print(f"Error generating report: {e}")
@@ -17,16 +17,36 @@ from flask import Flask, send_from_directory, request, jsonify, Response, stream
 from flask_cors import CORS
 import os, time, json, re
 from gemini import gemini_get_text_response
-from interview_simulator import stream_interview
-from cache import create_cache_zip
+from interview_scheduler import get_interview_scheduler, SchedulerSaturatedError
+from interview_simulator import PCP_PROFILE, synthesize_exchange_audio, interview_exchanges, adapt_audio_data_url
+from neuro_simulator import NEURO_PROFILE
+import interview_store
+from interview_store import new_interview_id, format_event_id, parse_event_id
+from report_delta import ReportDeltaEncoder
+from cache import create_cache_zip, memo_cache
 from medgemma import medgemma_get_text_response
 from neuro_api import register_neuro_routes
+from warmup import get_warmup_job, WARMUP_ON_STARTUP
+from quality_governor import get_quality_governor
+from tracing import register_trace_routes
+from degradation import get_degradation_stats
+from audio_encoder import negotiate_codec, choose_bitrate
+from tts_executor import get_tts_executor, tts_priority, PRIORITY_PREFETCH
 
 app = Flask(__name__, static_folder=os.environ.get("FRONTEND_BUILD", "frontend/build"), static_url_path="/")
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
 
 # Register neurological API routes
 app = register_neuro_routes(app)
+# GET /api/trace/<interview_id>: span waterfall of an interview
+app = register_trace_routes(app)
+
+interview_scheduler = get_interview_scheduler()
+INTERVIEW_PROFILES = {profile.name: profile for profile in (PCP_PROFILE, NEURO_PROFILE)}
+# Seconds a client turned away by the saturated scheduler should wait before trying again.
+SATURATED_RETRY_AFTER = 30
+# Exchanges rendered per /exchange_audio request; each one is a blocking TTS call.
+EXCHANGE_AUDIO_PAGE_SIZE = int(os.environ.get("EXCHANGE_AUDIO_PAGE_SIZE", 3))
 
 @app.route("/")
 def serve():
@@ -36,20 +56,210 @@ def serve():
 
 @app.route("/api/stream_conversation", methods=["GET"])
 def stream_conversation():
-    """Streams the conversation with the interview simulator."""
+    """
+    Streams the conversation with the interview simulator.
+    Every event carries an id; a reconnecting EventSource sends the last one back in
+    the Last-Event-ID header and the interview resumes where the client left off.
+    The simulation itself runs on the interview scheduler; while it waits for a free
+    worker the client receives {"event": "queued", "position": n} messages.
+    When the client goes away the job is cancelled after a short reconnect grace period.
+    Optional `convergence_patience` ends the interview early once it stops adding information.
+    With `report_mode=delta` report events are sent as line deltas with periodic snapshots.
+    `thinking_summary=false` skips the summary of the interviewer's first thinking block.
+    `symptom_seed` decides the patient's optional symptoms once, reproducibly, for the session.
+    `tts_chunks=true` streams the audio of long lines sentence by sentence, in "audio_chunk" events.
+    `audio_codec` (mp3, ogg/opus or wav) picks the audio format the client can play.
+    `audio_quality` (low, medium, high or kbps) picks an audio bitrate variant; without it the
+    variant follows the `bandwidth` hint (downlink Mbps) or the Downlink/ECT client hint headers.
+    A rejected or failed interview ends with {"event": "error", "reason", "error", "retry_after"}
+    (e.g. reason "queue_full" or "user_limit" with retry_after seconds); the client should not reconnect.
+    """
+    return _start_interview_stream(PCP_PROFILE)
+
+
+@app.route("/api/neuro/stream_conversation", methods=["GET"])
+def stream_neuro_conversation():
+    """
+    Streams a neurological interview; same parameters and events as /api/stream_conversation,
+    plus a {"event": "localization"} event whenever a patient answer adds neurological findings.
+    """
+    return _start_interview_stream(NEURO_PROFILE)
+
+
+def _start_interview_stream(profile):
+    """Schedules (or re-attaches to) an interview of the given profile and streams its events."""
     patient = request.args.get("patient", "Patient")
     condition = request.args.get("condition", "unknown condition")
-    
+    interview_id, last_event_id = parse_event_id(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    if not interview_id:
+        interview_id = request.args.get("interview_id") or new_interview_id()
+    user_id = request.args.get("user_id") or request.headers.get("X-Forwarded-For", request.remote_addr or "").split(",")[0].strip()
+    options = {}
+    convergence_patience = request.args.get("convergence_patience", type=int)
+    if convergence_patience is not None:
+        options["convergence_patience"] = convergence_patience
+    if request.args.get("thinking_summary"):
+        options["thinking_summary"] = request.args.get("thinking_summary").lower() in ("1", "true", "yes")
+    if request.args.get("symptom_seed"):
+        options["symptom_seed"] = request.args.get("symptom_seed")
+    if request.args.get("tts_chunks"):
+        options["tts_chunks"] = request.args.get("tts_chunks").lower() in ("1", "true", "yes")
+    audio_codec, audio_bitrate = _audio_preferences()
+    if audio_codec:
+        options["audio_codec"] = audio_codec
+    if audio_bitrate:
+        options["audio_bitrate"] = audio_bitrate
+
+    try:
+        job = interview_scheduler.submit(interview_id, patient, condition, user_id, last_event_id, options, profile)
+    except SchedulerSaturatedError as e:
+        # EventSource cannot read the body of an error response (and would keep reconnecting),
+        # so the rejection is sent as the stream's only event.
+        return _error_stream_response(e.reason, str(e), retry_after=SATURATED_RETRY_AFTER)
+
+    return _event_stream_response(job, interview_id, last_event_id)
+
+
+@app.route("/api/watch/<interview_id>", methods=["GET"])
+def watch_conversation(interview_id):
+    """
+    Attaches a viewer to an existing interview (e.g. a classroom following one
+    simulated patient). The viewer gets the event backlog and then live events;
+    no new simulation is ever started, so upstream cost does not grow with viewers.
+    `audio_codec` and `audio_quality` (or the bandwidth hints) as for streaming: audio the
+    owner's client got in another format is transcoded for this viewer (once per clip and format).
+    An unknown interview gets a single {"event": "error", "reason": "not_found"} event.
+    """
+    _, last_event_id = parse_event_id(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    job = interview_scheduler.watch(interview_id)
+    if job is None:
+        return _error_stream_response("not_found", f"Interview not found: {interview_id}")
+    return _event_stream_response(job, interview_id, last_event_id, _audio_preferences())
+
+
+def _audio_preferences():
+    """(codec, bitrate kbps) the client asked for with audio_codec/audio_quality or bandwidth hints; None if not."""
+    codec = negotiate_codec(request.args.get("audio_codec")) if request.args.get("audio_codec") else None
+    bitrate = choose_bitrate(request.args.get("audio_quality"),
+                             request.args.get("bandwidth", type=float) or request.headers.get("Downlink", type=float),
+                             request.headers.get("ECT"))
+    return codec, bitrate
+
+
+def _viewer_audio(message, codec, bitrate):
+    """An event message with its audio, if any, in the viewer's codec/bitrate."""
+    payload = json.loads(message)
+    if not payload.get("audio"):
+        return message
+    payload["audio"] = adapt_audio_data_url(payload["audio"], codec, bitrate)
+    return json.dumps(payload)
+
+
+def _event_stream_response(job, interview_id, last_event_id, viewer_audio=(None, None)):
+    """
+    Relays the events of a scheduled (or remote) interview job as Server-Sent Events.
+    `viewer_audio` (codec, bitrate) adapts the audio of the events for a viewer.
+    """
+    report_encoder = ReportDeltaEncoder() if request.args.get("report_mode") == "delta" else None
+
     def generate():
         try:
-            for message in stream_interview(patient, condition):
-                yield f"data: {message}\n\n"
+            for kind, item in job.subscribe(interview_scheduler, last_event_id):
+                if kind == "queued":
+                    yield f"data: {json.dumps({'event': 'queued', 'position': item})}\n\n"
+                    continue
+                if kind == "heartbeat":
+                    # SSE comment; ignored by the browser, but fails fast if the client is gone.
+                    yield ": keep-alive\n\n"
+                    continue
+                seq, message = item
+                if any(viewer_audio):
+                    message = _viewer_audio(message, *viewer_audio)
+                if report_encoder:
+                    message = report_encoder.encode(message)
+                yield f"id: {format_event_id(interview_id, seq)}\ndata: {message}\n\n"
         except Exception as e:
-            yield f"data: Error: {str(e)}\n\n"
+            yield _error_event("internal", str(e))
             raise e
-            
+
     return Response(stream_with_context(generate()), mimetype="text/event-stream")
 
+
+def _error_event(reason, error, retry_after=None):
+    """An {"event": "error"} message; the client closes the stream when it gets one."""
+    return f"data: {json.dumps({'event': 'error', 'reason': reason, 'error': error, 'retry_after': retry_after})}\n\n"
+
+
+def _error_stream_response(reason, error, retry_after=None):
+    """A stream with a single error event, for requests rejected before any interview event."""
+    response = Response(_error_event(reason, error, retry_after), mimetype="text/event-stream")
+    if retry_after:
+        response.headers["Retry-After"] = str(retry_after)
+    return response
+
+@app.route("/api/interview/<interview_id>/exchange_audio", methods=["GET"])
+def exchange_audio(interview_id):
+    """
+    Replays the question/answer exchanges of a stored interview, each rendered in one
+    multi-speaker TTS request with the offsets of the two speakers' segments.
+    `turn` (0-based) selects a single exchange; otherwise up to EXCHANGE_AUDIO_PAGE_SIZE exchanges
+    are rendered from `start` (0-based), and `next_start` points at the next page (None after
+    the last one). `audio_codec` and `audio_quality` as for streaming. Rendering is queued
+    behind the audio of live interviews.
+    """
+    checkpoint = interview_store.load_checkpoint(interview_id)
+    if not checkpoint:
+        return jsonify({"error": f"Interview not found: {interview_id}"}), 404
+    profile = INTERVIEW_PROFILES.get(checkpoint.get("profile"), PCP_PROFILE)
+    patient_voice = profile.patient_voice(checkpoint["patient"])
+    exchanges = list(enumerate(interview_exchanges(interview_id)))
+    turn = request.args.get("turn", type=int)
+    next_start = None
+    if turn is not None:
+        exchanges = exchanges[turn:turn + 1] if turn >= 0 else []
+        if not exchanges:
+            return jsonify({"error": f"No exchange {turn} in interview {interview_id}"}), 404
+    else:
+        start = max(0, request.args.get("start", 0, type=int))
+        if start + EXCHANGE_AUDIO_PAGE_SIZE < len(exchanges):
+            next_start = start + EXCHANGE_AUDIO_PAGE_SIZE
+        exchanges = exchanges[start:start + EXCHANGE_AUDIO_PAGE_SIZE]
+    codec = negotiate_codec(request.args.get("audio_codec")) if request.args.get("audio_codec") else None
+    bitrate = choose_bitrate(request.args.get("audio_quality"))
+    with tts_priority(PRIORITY_PREFETCH):
+        rendered = [dict(synthesize_exchange_audio(question, answer, patient_voice, codec, bitrate),
+                         turn=index, question=question, answer=answer)
+                    for index, (question, answer) in exchanges]
+    return jsonify({
+        "interview_id": interview_id,
+        "exchanges": rendered,
+        "next_start": next_start
+    })
+
+@app.route("/api/scheduler_stats")
+def scheduler_stats():
+    """
+    Returns the current load of the interview scheduler, the quality level new interviews
+    get, how many turns were degraded by their deadline, the TTS queue depth and the hit
+    rates of the memory and disk cache tiers.
+    """
+    return jsonify(dict(interview_scheduler.stats(), quality=get_quality_governor().stats(),
+                        degradations=get_degradation_stats().stats(), tts=get_tts_executor().stats(),
+                        cache=memo_cache.stats()))
+
+@app.route("/api/warmup", methods=["GET", "POST"])
+def warmup():
+    """
+    GET returns the progress of the warm-up job (EHR summaries and fixed TTS phrases);
+    POST starts it in the background if it is not already running.
+    """
+    warmup_job = get_warmup_job()
+    if request.method == "POST":
+        started = warmup_job.start()
+        return jsonify(dict(warmup_job.status(), started=started)), 202 if started else 200
+    return jsonify(warmup_job.status())
+
+
 @app.route("/api/evaluate_report", methods=["POST"])
 def evaluate_report_call():
     """Evaluates the provided medical report."""
@@ -87,4 +297,8 @@ def static_proxy(path):
         return send_from_directory(app.static_folder, "index.html")
         
 if __name__ == "__main__":
+    # Under gunicorn the warm-up is started by the post_worker_init hook (gunicorn.conf.py).
+    # Never at import: encoder processes re-import the main module as __mp_main__.
+    if WARMUP_ON_STARTUP:
+        get_warmup_job().start()
     app.run(host="0.0.0.0", port=7860, threaded=True)
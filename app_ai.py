@@ -8,11 +8,16 @@ import json
 import os
 import base64
 from ai_conversation import get_ai_conversation
-from tts_service import get_tts_service
+from tts_service import get_tts_service, register_tts_routes
 from neuro_api import parse_neurological_findings, SYNDROMES, CRANIAL_NERVES
+from tracing import span, register_trace_routes
+from cancellation import Deadline
+from degradation import TURN_DEADLINE_SECONDS
 
 app = Flask(__name__, static_folder='frontend/build', static_url_path='')
 CORS(app)
+# GET /api/trace/<session_id>: span waterfall of a conversation
+register_trace_routes(app)
 
 # Initialize AI services
 ai_conv = get_ai_conversation()
@@ -31,6 +36,9 @@ def load_patients_and_conditions():
 # Store active conversations
 conversations = {}
 
+# GET /api/stream_audio/<session_id>?text=...: patient speech streamed while it is synthesized
+register_tts_routes(app, lambda session_id: conversations.get(session_id, {}).get('patient'))
+
 @app.route('/')
 def serve_frontend():
     """Serve the React frontend"""
@@ -102,19 +110,24 @@ def continue_conversation(session_id):
     
     if action == 'complete':
         # Generate final report
-        report = ai_conv.generate_report(history, patient, condition, conv['findings'])
+        with span("conversation.report", trace_id=session_id):
+            report = ai_conv.generate_report(history, patient, condition, conv['findings'])
         return jsonify({
             "action": "report",
             "report": report,
             "findings": conv['findings']
         })
     
+    # Both replies share one turn deadline; a reply that cannot make it falls back to canned text.
+    deadline = Deadline(TURN_DEADLINE_SECONDS) if TURN_DEADLINE_SECONDS > 0 else None
+
     # Generate patient response
-    patient_response = ai_conv.generate_patient_response(history, patient, condition)
+    with span("conversation.patient", trace_id=session_id, turn=len(history) // 2):
+        patient_response, patient_degraded = ai_conv.generate_patient_response(history, patient, condition, deadline)
     history.append({"role": "patient", "content": patient_response})
     
-    # Parse for neurological findings if it's a neurological condition
-    if condition.get('level'):  # Neurological condition
+    # Parse for neurological findings if it's a neurological condition (a canned answer has none)
+    if condition.get('level') and not patient_degraded:  # Neurological condition
         findings = parse_neurological_findings(patient_response)
         if findings['cranialNerves']:
             conv['findings']['cranialNerves'].extend(findings['cranialNerves'])
@@ -124,13 +137,16 @@ def continue_conversation(session_id):
             conv['findings']['level'] = findings['level']
     
     # Generate interviewer's next question
-    interviewer_response = ai_conv.generate_interviewer_response(history, patient, condition)
+    with span("conversation.interviewer", trace_id=session_id, turn=len(history) // 2):
+        interviewer_response, interviewer_degraded = ai_conv.generate_interviewer_response(history, patient, condition, deadline)
     history.append({"role": "interviewer", "content": interviewer_response})
     
     return jsonify({
         "action": "continue",
         "patient_message": patient_response,
         "interviewer_message": interviewer_response,
+        # Which replies are canned fallbacks (the upstream call failed or missed the turn deadline).
+        "degraded": {"patient": patient_degraded, "interviewer": interviewer_degraded},
         "findings": conv['findings'],
         "turn": len(history) // 2
     })
@@ -147,7 +163,8 @@ def generate_audio(session_id):
     
     if role == 'patient':
         patient = conversations[session_id]['patient']
-        audio_bytes = tts_service.generate_speech(text, patient)
+        with span("conversation.tts", trace_id=session_id, chars=len(text or "")):
+            audio_bytes = tts_service.generate_speech(text, patient)
         
         if audio_bytes:
             # Return audio as base64
@@ -169,7 +186,8 @@ def evaluate_report(session_id):
     report_text = data.get('report')
     
     conv = conversations[session_id]
-    evaluation = ai_conv.evaluate_report(report_text, conv['patient'], conv['condition'])
+    with span("conversation.evaluate_report", trace_id=session_id):
+        evaluation = ai_conv.evaluate_report(report_text, conv['patient'], conv['condition'])
     
     return jsonify({"evaluation": evaluation})
 
@@ -0,0 +1,238 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Audio encoding off the request threads.
+
+Clips are encoded on a small persistent process pool, so encoding neither holds
+the GIL of the serving process nor forks from its (threaded) request workers.
+MP3, including the mono bitrate variants, is encoded in-process with lameenc
+when it is installed (from PCM decoded by soundfile where its libsndfile reads
+the source) and WAV to OGG/Opus with soundfile when its libsndfile supports
+Opus; anything else falls back to pydub, which runs ffmpeg.
+
+The pool's processes are spawned, and spawning re-imports the main module (as
+__mp_main__) in each of them: entry points must keep background work under
+their `if __name__ == "__main__"` guard or in a server hook (see gunicorn.conf.py).
+
+    encode_audio(wav_bytes, "wav", "mp3") -> mp3 bytes
+    concat_audio([mp3_a, mp3_b], "mp3") -> one mp3, decoded and re-encoded once
+
+Cached TTS audio is the master copy of a clip; lower-bitrate mono variants for
+clients on slow connections are derived from it (see choose_bitrate).
+"""
+
+import concurrent.futures
+import io
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import wave
+
+from pydub import AudioSegment
+
+try:
+    import lameenc
+except ImportError:
+    lameenc = None
+
+try:
+    import numpy as np
+    import soundfile
+except (ImportError, OSError):
+    soundfile = None
+
+# Encoder processes; 0 encodes on the calling thread.
+AUDIO_ENCODER_WORKERS = int(os.environ.get("AUDIO_ENCODER_WORKERS", 2))
+MP3_BITRATE_KBPS = int(os.environ.get("MP3_BITRATE_KBPS", 128))
+
+CODEC_MIME_TYPES = {"mp3": "audio/mpeg", "ogg": "audio/ogg", "wav": "audio/wav"}
+DEFAULT_CODEC = "mp3"
+# Bitrate variants (kbps) a client can ask for; "high" is the master copy.
+AUDIO_BITRATE_VARIANTS = {"low": 32, "medium": 64, "high": MP3_BITRATE_KBPS}
+# Below these downlink speeds (Mbps) clients get the "low" and "medium" variants.
+LOW_BANDWIDTH_MBPS = 0.15
+MEDIUM_BANDWIDTH_MBPS = 0.6
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def negotiate_codec(requested: str = None) -> str:
+    """Returns the codec a client asked for ("mp3", "ogg"/"opus" or "wav"), or DEFAULT_CODEC."""
+    codec = (requested or "").strip().lower()
+    codec = "ogg" if codec == "opus" else codec
+    return codec if codec in CODEC_MIME_TYPES else DEFAULT_CODEC
+
+
+def choose_bitrate(quality: str = None, downlink_mbps: float = None, effective_type: str = None) -> int:
+    """
+    Picks a bitrate variant (kbps) from an explicit quality ("low", "medium", "high" or a
+    number of kbps) or else from a bandwidth hint: the client's downlink estimate in Mbps
+    or its effective connection type ("slow-2g", "2g", "3g", "4g"). Returns None for the master.
+    """
+    if quality:
+        quality = quality.strip().lower()
+        if quality in AUDIO_BITRATE_VARIANTS:
+            kbps = AUDIO_BITRATE_VARIANTS[quality]
+        elif quality.isdigit():
+            # Round down to the nearest variant.
+            kbps = max([v for v in AUDIO_BITRATE_VARIANTS.values() if v <= int(quality)] or [min(AUDIO_BITRATE_VARIANTS.values())])
+        else:
+            kbps = None
+    elif downlink_mbps is not None:
+        kbps = (AUDIO_BITRATE_VARIANTS["low"] if downlink_mbps < LOW_BANDWIDTH_MBPS else
+                AUDIO_BITRATE_VARIANTS["medium"] if downlink_mbps < MEDIUM_BANDWIDTH_MBPS else None)
+    elif effective_type:
+        kbps = {"slow-2g": AUDIO_BITRATE_VARIANTS["low"], "2g": AUDIO_BITRATE_VARIANTS["low"],
+                "3g": AUDIO_BITRATE_VARIANTS["medium"]}.get(effective_type.strip().lower())
+    else:
+        kbps = None
+    return kbps if kbps and kbps < MP3_BITRATE_KBPS else None
+
+
+def codec_for_mime_type(mime_type: str) -> str:
+    return next((codec for codec, mime in CODEC_MIME_TYPES.items() if mime == (mime_type or "").lower()), None)
+
+
+def _lame_mp3(wav_bytes: bytes, bitrate_kbps: int = None) -> bytes:
+    with wave.open(io.BytesIO(wav_bytes), 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError("lameenc needs 16-bit PCM")
+        channels, rate, frames = wav.getnchannels(), wav.getframerate(), wav.readframes(wav.getnframes())
+    encoder = lameenc.Encoder()
+    encoder.set_bit_rate(bitrate_kbps or MP3_BITRATE_KBPS)
+    encoder.set_in_sample_rate(rate)
+    encoder.set_channels(channels)
+    encoder.set_quality(2)
+    return bytes(encoder.encode(frames) + encoder.flush())
+
+
+def _decode_wav(data: bytes, source_format: str, mono: bool = False) -> bytes:
+    """Decodes `data` to 16-bit WAV (downmixed to mono if asked): with soundfile if it can, else ffmpeg."""
+    if source_format == "wav" and not mono:
+        return data
+    buffer = io.BytesIO()
+    if soundfile is not None:
+        try:
+            samples, rate = soundfile.read(io.BytesIO(data), dtype="int16", always_2d=True)
+            if mono and samples.shape[1] > 1:
+                samples = samples.mean(axis=1).astype(np.int16)
+            soundfile.write(buffer, samples, rate, format="WAV", subtype="PCM_16")
+            return buffer.getvalue()
+        except Exception as e:
+            logging.info("soundfile cannot decode %s (%s); decoding with ffmpeg.", source_format, e)
+            buffer = io.BytesIO()
+    segment = AudioSegment.from_file(io.BytesIO(data), format=source_format).set_sample_width(2)
+    if mono:
+        segment = segment.set_channels(1)
+    segment.export(buffer, format="wav")
+    return buffer.getvalue()
+
+
+def _soundfile_opus(wav_bytes: bytes) -> bytes:
+    samples, rate = soundfile.read(io.BytesIO(wav_bytes), dtype="int16")
+    buffer = io.BytesIO()
+    soundfile.write(buffer, np.ascontiguousarray(samples), rate, format="OGG", subtype="OPUS")
+    return buffer.getvalue()
+
+
+def _pydub_encode(data: bytes, source_format: str, codec: str, bitrate_kbps: int = None) -> bytes:
+    buffer = io.BytesIO()
+    segment = AudioSegment.from_file(io.BytesIO(data), format=source_format)
+    if bitrate_kbps:
+        segment = segment.set_channels(1)
+    if codec == "ogg":
+        segment.export(buffer, format="ogg", codec="libopus", bitrate=f"{bitrate_kbps}k" if bitrate_kbps else None)
+    elif codec == "mp3":
+        segment.export(buffer, format="mp3", bitrate=f"{bitrate_kbps or MP3_BITRATE_KBPS}k")
+    else:
+        segment.export(buffer, format=codec)
+    return buffer.getvalue()
+
+
+def _encode(data: bytes, source_format: str, codec: str, bitrate_kbps: int = None) -> bytes:
+    """
+    Runs in an encoder process (or inline): converts `data` from `source_format` to `codec`,
+    as a mono variant at `bitrate_kbps` if given.
+    """
+    if codec == source_format and not bitrate_kbps:
+        return data
+    try:
+        if codec == "mp3" and lameenc is not None:
+            return _lame_mp3(_decode_wav(data, source_format, mono=bool(bitrate_kbps)), bitrate_kbps)
+        if codec == "ogg" and soundfile is not None and source_format == "wav" and not bitrate_kbps:
+            return _soundfile_opus(data)
+    except Exception as e:
+        logging.info("In-process %s encoding failed (%s); falling back to ffmpeg.", codec, e)
+    return _pydub_encode(data, source_format, codec, bitrate_kbps)
+
+
+def _concat(clips: list, codec: str) -> bytes:
+    """
+    Runs in an encoder process (or inline): decodes clips in `codec` to PCM, joins them and
+    encodes the result once, so no encoder delay or padding ends up between the clips.
+    """
+    joined = AudioSegment.empty()
+    for clip in clips:
+        joined += AudioSegment.from_file(io.BytesIO(clip), format=codec)
+    buffer = io.BytesIO()
+    joined.export(buffer, format="wav")
+    return _encode(buffer.getvalue(), "wav", codec)
+
+
+def _init_encoder_process():
+    # Ctrl-C is for the parent, which shuts the pool down; encoders just finish their clip.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: a fork of the threaded server could inherit held locks.
+            _pool = concurrent.futures.ProcessPoolExecutor(max_workers=AUDIO_ENCODER_WORKERS,
+                                                           mp_context=multiprocessing.get_context("spawn"),
+                                                           initializer=_init_encoder_process)
+        return _pool
+
+
+def _on_pool(fn, *args):
+    global _pool
+    if AUDIO_ENCODER_WORKERS <= 0:
+        return fn(*args)
+    try:
+        return _get_pool().submit(fn, *args).result()
+    except concurrent.futures.process.BrokenProcessPool:
+        logging.warning("Audio encoder pool broke; encoding on the calling thread.")
+        with _pool_lock:
+            _pool = None
+        return fn(*args)
+
+
+def encode_audio(data: bytes, source_format: str, codec: str = DEFAULT_CODEC, bitrate_kbps: int = None) -> bytes:
+    """
+    Converts audio from `source_format` to `codec` (a mono variant at `bitrate_kbps` if
+    given) on the encoder pool and returns the bytes.
+    """
+    if codec == source_format and not bitrate_kbps:
+        return _encode(data, source_format, codec, bitrate_kbps)
+    return _on_pool(_encode, data, source_format, codec, bitrate_kbps)
+
+
+def concat_audio(clips: list, codec: str = DEFAULT_CODEC) -> bytes:
+    """Joins clips encoded in `codec` into one clip in `codec`, on the encoder pool."""
+    return _on_pool(_concat, list(clips), codec)
@@ -0,0 +1,190 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Fan-out of one live interview to many viewers.
+
+In-process, a running interview publishes into an InterviewChannel: a ring
+buffer of recent events plus a condition variable for live delivery. Viewers
+that attach late get older events from the persistent interview store, then
+the ring buffer, then live events, so upstream cost does not depend on the
+number of viewers.
+
+With BROADCAST_BACKEND=diskcache the channel also advertises itself in the
+shared interview store, and viewers connected to another gunicorn worker tail
+the persisted event log instead of starting a second simulation.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+
+import interview_store
+from cache import interview_cache
+
+BROADCAST_RING_SIZE = int(os.environ.get("BROADCAST_RING_SIZE", 64))
+BROADCAST_BACKEND = os.environ.get("BROADCAST_BACKEND", "local").lower()  # "local" or "diskcache"
+# A live marker or viewer marker that has not been refreshed for this many seconds is stale.
+BROADCAST_LIVE_TTL = float(os.environ.get("BROADCAST_LIVE_TTL", 30))
+
+
+class InterviewChannel:
+    """Pub/sub channel for one live interview."""
+
+    def __init__(self, interview_id: str, start_seq: int = 0, ring_size: int = BROADCAST_RING_SIZE):
+        self.interview_id = interview_id
+        # Events up to and including start_seq were never published here; they
+        # are served from the interview store.
+        self.start_seq = start_seq
+        self.last_seq = start_seq
+        self.closed = False
+        self.error = None
+        self._ring = collections.deque(maxlen=ring_size)
+        self._cond = threading.Condition()
+        if BROADCAST_BACKEND == "diskcache":
+            _live_channels[interview_id] = self
+            _mark_live(interview_id)
+            _ensure_marker_refresher()
+
+    def publish(self, seq: int, message: str):
+        with self._cond:
+            self._ring.append((seq, message))
+            self.last_seq = seq
+            self._cond.notify_all()
+
+    def close(self, error: Exception = None):
+        with self._cond:
+            self.closed = True
+            self.error = error
+            self._cond.notify_all()
+        if _live_channels.get(self.interview_id) is self:
+            del _live_channels[self.interview_id]
+            interview_cache.delete(("interview_live", self.interview_id))
+
+    def subscribe(self, after_seq: int = 0, poll_interval: float = 1.0):
+        """
+        Yields (seq, message) for every event with seq > after_seq: first the
+        backlog, then live events. Yields None after each idle poll_interval so
+        the caller can send keep-alives. Raises the channel error, if any, once drained.
+        """
+        while True:
+            with self._cond:
+                oldest = self._ring[0][0] if self._ring else self.last_seq + 1
+                if after_seq + 1 < oldest:
+                    # The viewer is behind the ring buffer; catch up from the store first.
+                    backlog_until = oldest - 1
+                    pending = None
+                else:
+                    if self.last_seq <= after_seq and not self.closed:
+                        self._cond.wait(poll_interval)
+                    pending = [event for event in self._ring if event[0] > after_seq]
+                    closed, error = self.closed, self.error
+
+            if pending is None:
+                caught_up = after_seq
+                for seq, message in interview_store.load_events(self.interview_id, after_seq, backlog_until):
+                    caught_up = seq
+                    yield seq, message
+                if caught_up == after_seq:
+                    # The backlog is gone from the store as well; skip the gap.
+                    caught_up = backlog_until
+                after_seq = caught_up
+                continue
+
+            for seq, message in pending:
+                after_seq = seq
+                yield seq, message
+            if closed and not pending:
+                if error:
+                    raise error
+                return
+            if not pending:
+                yield None
+
+
+def tail_store(interview_id: str, after_seq: int = 0, poll_interval: float = 1.0):
+    """
+    Follows the persisted event log of an interview that runs in another worker.
+    Yields (seq, message) or None on idle polls, like InterviewChannel.subscribe,
+    and returns after the end event or once the interview is no longer live.
+    """
+    seq = after_seq
+    while True:
+        _mark_viewer(interview_id)
+        message = interview_store.load_event(interview_id, seq + 1)
+        if message is not None:
+            seq += 1
+            yield seq, message
+            if json.loads(message).get("event") == "end":
+                return
+            continue
+        if not is_live(interview_id):
+            # Check once more: the owner may have written the last events and closed.
+            if interview_store.load_event(interview_id, seq + 1) is None:
+                return
+            continue
+        yield None
+        time.sleep(poll_interval)
+
+
+def is_live(interview_id: str) -> bool:
+    """True if some worker advertises the interview as currently running."""
+    marker = interview_cache.get(("interview_live", interview_id))
+    return bool(marker) and time.time() - marker["ts"] < BROADCAST_LIVE_TTL
+
+
+def is_live_elsewhere(interview_id: str) -> bool:
+    """True if the interview is running in a different worker process."""
+    marker = interview_cache.get(("interview_live", interview_id))
+    return (bool(marker) and marker["pid"] != os.getpid()
+            and time.time() - marker["ts"] < BROADCAST_LIVE_TTL)
+
+
+def has_remote_viewers(interview_id: str) -> bool:
+    """True if a viewer in another worker tailed the interview recently."""
+    ts = interview_cache.get(("interview_viewer", interview_id))
+    return ts is not None and time.time() - ts < BROADCAST_LIVE_TTL
+
+
+def _mark_live(interview_id: str):
+    interview_cache.set(("interview_live", interview_id), {"pid": os.getpid(), "ts": time.time()},
+                        expire=BROADCAST_LIVE_TTL * 2)
+
+
+def _mark_viewer(interview_id: str):
+    interview_cache.set(("interview_viewer", interview_id), time.time(), expire=BROADCAST_LIVE_TTL * 2)
+
+
+# Channels advertised in the interview store by this process, refreshed periodically
+# so viewers elsewhere can tell a slow turn from a dead worker.
+_live_channels = {}
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def _ensure_marker_refresher():
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_markers, name="broadcast-live-markers", daemon=True)
+            _refresher.start()
+
+
+def _refresh_markers():
+    while True:
+        time.sleep(BROADCAST_LIVE_TTL / 3)
+        for interview_id in list(_live_channels):
+            _mark_live(interview_id)
@@ -0,0 +1,226 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Headless bulk interview simulation, for building evaluation datasets.
+
+Runs primary-care or neurological interviews for every patient x condition x seed
+combination on a worker pool, under a process-wide upstream rate limit, and
+appends one JSON line per finished run (transcript, report, per-stage timings)
+to the output file. Re-running with the same output skips the runs that are
+already done; interrupted interviews resume from their last checkpoint.
+
+    python bulk_runner.py --kind pcp --seeds 1,2,3 --workers 4 --rate 2 --output runs.jsonl
+    python bulk_runner.py --kind neuro --output neuro_runs.parquet
+
+A .parquet output is written from the JSONL log (<output>.jsonl) once the batch
+finishes; it needs pyarrow.
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+import time
+
+import interview_store
+from cancellation import CancelToken, set_upstream_rate_limit
+from interview_simulator import PATIENTS, SYMPTOMS, stream_interview_events
+from neuro_interview import NEURO_PATIENTS
+from neuro_simulator import neuro_conditions, stream_neuro_interview_events
+
+BULK_WORKERS = int(os.environ.get("BULK_WORKERS", 4))
+# Upstream (LLM/TTS) calls started per second across all workers.
+BULK_RATE_LIMIT = float(os.environ.get("BULK_RATE_LIMIT", 2))
+
+
+def plan_runs(kind, patients=None, conditions=None, seeds=None) -> list[dict]:
+    """
+    Expands the patient x condition x seed grid. Neurological patients default to
+    their own conditions, primary-care patients to every condition in symptoms.json.
+    """
+    all_patients = NEURO_PATIENTS if kind == "neuro" else PATIENTS
+    names = patients or [patient["name"] for patient in all_patients]
+    runs = []
+    for patient_name in names:
+        patient_conditions = conditions or (neuro_conditions(patient_name) if kind == "neuro" else list(SYMPTOMS))
+        for condition_name in patient_conditions:
+            for seed in seeds or [""]:
+                run_id = f"{kind}|{patient_name}|{condition_name}|{seed}"
+                runs.append({
+                    "run_id": run_id,
+                    "kind": kind,
+                    "patient": patient_name,
+                    "condition": condition_name,
+                    "seed": seed,
+                    # Stable per run, so an interrupted interview resumes from its checkpoint.
+                    "interview_id": "bulk-" + hashlib.sha1(run_id.encode("utf-8")).hexdigest()[:20]
+                })
+    return runs
+
+
+def completed_run_ids(jsonl_path) -> set[str]:
+    """Returns the ids of the runs that already finished successfully in a JSONL output."""
+    done = set()
+    if not os.path.exists(jsonl_path):
+        return done
+    with open(jsonl_path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut short by an interrupted run.
+            if record.get("status") == "done":
+                done.add(record["run_id"])
+    return done
+
+
+def run_one(run, options, cancel=None) -> dict:
+    """Runs a single interview to the end (or until `cancel` is set) and returns its output record."""
+    stream = stream_neuro_interview_events if run["kind"] == "neuro" else stream_interview_events
+    run_options = dict(options)
+    if run["seed"]:
+        run_options["symptom_seed"] = run["seed"]
+
+    started = time.time()
+    transcript, report, thinking, converged = [], "", None, False
+    record = dict(run, started_at=started)
+    try:
+        for _, message in stream(run["patient"], run["condition"], run["interview_id"], cancel=cancel,
+                              options=run_options):
+            payload = json.loads(message)
+            speaker = payload.get("speaker")
+            if speaker in ("interviewer", "patient"):
+                transcript.append({"speaker": speaker, "text": payload["text"]})
+                converged = converged or payload.get("reason") == "converged"
+            elif speaker == "report":
+                report = payload["text"]
+            elif speaker == "interviewer thinking":
+                thinking = payload["text"]
+        checkpoint = interview_store.load_checkpoint(run["interview_id"]) or {}
+        state = checkpoint.get("state", {})
+        timings = state.get("timings", {})
+        record.update(
+            status="done",
+            turns=sum(1 for entry in transcript if entry["speaker"] == "patient"),
+            converged=converged,
+            degradations=state.get("degradations", {}),
+            transcript=transcript,
+            report=report,
+            thinking=thinking,
+            timings={stage: {"calls": len(durations), "total_s": round(sum(durations), 3),
+                             "mean_s": round(sum(durations) / len(durations), 3)}
+                     for stage, durations in timings.items() if durations}
+        )
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record.update(finished_at=time.time(), wall_s=round(time.time() - started, 3))
+    return record
+
+
+def run_batch(runs, output, workers=BULK_WORKERS, rate=BULK_RATE_LIMIT, options=None) -> dict:
+    """
+    Runs every run not already done in `output`, `workers` at a time, appending a
+    JSON line per run as it finishes. Returns counts of done/failed/skipped runs.
+    On Ctrl-C (or any other error) the batch stops right away: queued runs are dropped and
+    running interviews cancelled; a later call with the same output picks them up again.
+    """
+    jsonl_path = output + ".jsonl" if output.endswith(".parquet") else output
+    done = completed_run_ids(jsonl_path)
+    pending = [run for run in runs if run["run_id"] not in done]
+    print(f"Bulk run: {len(runs)} runs, {len(runs) - len(pending)} already done, {len(pending)} to go "
+          f"({workers} workers, {rate or 'unlimited'} upstream calls/s)")
+    set_upstream_rate_limit(rate, burst=workers)
+
+    counts = {"done": 0, "failed": 0, "skipped": len(runs) - len(pending)}
+    write_lock = threading.Lock()
+    cancel = CancelToken()
+    with open(jsonl_path, 'a') as out:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-run")
+        try:
+            futures = [executor.submit(run_one, run, options or {}, cancel) for run in pending]
+            for future in concurrent.futures.as_completed(futures):
+                record = future.result()
+                with write_lock:
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+                counts["done" if record["status"] == "done" else "failed"] += 1
+                print(f"[{counts['done'] + counts['failed']}/{len(pending)}] {record['run_id']}: {record['status']} "
+                      f"in {record['wall_s']:.1f}s" + (f" ({record['error']})" if record.get("error") else ""))
+        except BaseException:
+            # Do not wait for the rest of the batch. Unfinished runs have no "done" record,
+            # so they are retried (from their checkpoints) by the next run.
+            cancel.cancel("bulk run interrupted")
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+    if output.endswith(".parquet"):
+        write_parquet(jsonl_path, output)
+    return counts
+
+
+def write_parquet(jsonl_path, parquet_path):
+    """Converts the successful records of a JSONL output to Parquet (requires pyarrow)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print(f"pyarrow is not installed; results are in {jsonl_path}")
+        return
+    with open(jsonl_path, 'r') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    records = [record for record in records if record.get("status") == "done"]
+    for record in records:
+        # Stage names vary between runs; keep the timings as a JSON string column.
+        record["timings"] = json.dumps(record.get("timings", {}))
+    pq.write_table(pa.Table.from_pylist(records), parquet_path)
+    print(f"Wrote {len(records)} runs to {parquet_path}")
+
+
+def _split(value):
+    return [item.strip() for item in value.split(",") if item.strip()] if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run simulated interviews in bulk.")
+    parser.add_argument("--kind", choices=["pcp", "neuro"], default="pcp", help="Primary-care or neurological interviews.")
+    parser.add_argument("--patients", help="Comma-separated patient names (default: all).")
+    parser.add_argument("--conditions", help="Comma-separated condition names (default: all for the kind).")
+    parser.add_argument("--seeds", help="Comma-separated optional-symptom seeds (default: one unseeded run).")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS, help="Interviews run in parallel.")
+    parser.add_argument("--rate", type=float, default=BULK_RATE_LIMIT, help="Upstream calls per second, 0 for no limit.")
+    parser.add_argument("--output", default="bulk_runs.jsonl", help="Output .jsonl or .parquet file.")
+    parser.add_argument("--tts", action="store_true", help="Also synthesize speech (off by default).")
+    parser.add_argument("--thinking-summary", action="store_true", help="Summarize the interviewer's first thinking block.")
+    parser.add_argument("--convergence-patience", type=int, help="End interviews after this many uninformative turns.")
+    args = parser.parse_args()
+
+    # Datasets want complete turns, however long they take: no per-turn deadline.
+    options = {"tts": args.tts, "thinking_summary": args.thinking_summary, "turn_deadline": 0}
+    if args.convergence_patience is not None:
+        options["convergence_patience"] = args.convergence_patience
+    runs = plan_runs(args.kind, _split(args.patients), _split(args.conditions), _split(args.seeds))
+    try:
+        counts = run_batch(runs, args.output, args.workers, args.rate, options)
+    except KeyboardInterrupt:
+        print(f"Bulk run interrupted; run again with --output {args.output} to resume.")
+        raise SystemExit(130)
+    print(f"Bulk run finished: {counts['done']} done, {counts['failed']} failed, {counts['skipped']} skipped")
+
+
+if __name__ == "__main__":
+    main()
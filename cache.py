@@ -12,14 +12,100 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from diskcache import Cache
+from diskcache import Cache, FanoutCache
+from diskcache.core import ENOVAL, args_to_key, full_name
+import collections
+import fcntl
+import fnmatch
+import functools
 import os
+import re
 import shutil
+import sys
 import tempfile
+import threading
+import time
 import zipfile
 import logging
 
-cache = Cache(os.environ.get("CACHE_DIR", "/cache"))
+# In-process tier of memo_cache: at most this many entries and (approximately) bytes.
+MEMORY_CACHE_MAX_ENTRIES = int(os.environ.get("MEMORY_CACHE_MAX_ENTRIES", 2048))
+MEMORY_CACHE_MAX_BYTES = int(os.environ.get("MEMORY_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# The cache is split over this many SQLite shards (one writer lock each), so concurrent
+# interviews in several workers do not queue on a single lock. Only used for new cache
+# directories; an existing sharded directory keeps the shard count it was created with.
+CACHE_SHARDS = int(os.environ.get("CACHE_SHARDS", 8))
+# Seconds a cache operation waits for a shard's lock, as diskcache.Cache did by default.
+CACHE_TIMEOUT = float(os.environ.get("CACHE_TIMEOUT", 60))
+
+CACHE_DIR = os.environ.get("CACHE_DIR", "/cache")
+# Interview event logs and checkpoints (patient transcripts and audio) live in a cache of
+# their own: they neither compete with LLM/TTS results for space nor go into the archive.
+INTERVIEW_STORE_DIR = os.environ.get("INTERVIEW_STORE_DIR", os.path.join(CACHE_DIR, "interviews"))
+INTERVIEW_STORE_SIZE_LIMIT = int(os.environ.get("INTERVIEW_STORE_SIZE_LIMIT", 2**30))
+
+_SHARD_DIR = re.compile(r"^\d{3}$")
+_MIGRATION_LOCK = "migrate.lock"
+# Written once the unsharded cache is migrated; delete it to migrate a restored old archive again.
+_MIGRATION_MARKER = "migrated"
+# Files in the cache directory that are not cache data and stay out of the archive
+# (tracing.py exports traces.jsonl there, rotated to traces.jsonl.1).
+_ZIP_EXCLUDE = (_MIGRATION_LOCK, _MIGRATION_MARKER, "traces*.jsonl*")
+
+
+def _shard_count(directory: str) -> int:
+    """The shard count of an existing sharded cache directory, or CACHE_SHARDS for a new one."""
+    shards = [name for name in os.listdir(directory) if _SHARD_DIR.match(name)] if os.path.isdir(directory) else []
+    return len(shards) or CACHE_SHARDS
+
+
+def _migrate_single_cache(directory: str, sharded: FanoutCache):
+    """
+    Moves the entries of an unsharded diskcache.Cache in `directory` (e.g. an unzipped
+    cache_archive.zip from before sharding) into `sharded`, keeping expiry times and tags,
+    then removes the old database and writes the completion marker. Safe to run from
+    several workers at once.
+    """
+    with open(os.path.join(directory, _MIGRATION_LOCK), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if _migrated(directory) or not os.path.exists(os.path.join(directory, "cache.db")):
+            return  # Another worker migrated it.
+        with Cache(directory) as legacy:
+            moved = 0
+            for key in legacy.iterkeys():
+                value, expire_time, tag = legacy.get(key, default=ENOVAL, expire_time=True, tag=True, retry=True)
+                if value is ENOVAL:
+                    continue  # Expired.
+                expire = expire_time - time.time() if expire_time else None
+                sharded.set(key, value, expire=expire, tag=tag, retry=True)
+                moved += 1
+            legacy.clear(retry=True)
+        for name in ("cache.db", "cache.db-wal", "cache.db-shm"):
+            if os.path.exists(os.path.join(directory, name)):
+                os.remove(os.path.join(directory, name))
+        with open(os.path.join(directory, _MIGRATION_MARKER), "w") as marker:
+            marker.write(f"{moved}\n")
+        print(f"Cache migrated to the sharded layout: {moved} items")
+
+
+def _migrated(directory: str) -> bool:
+    return os.path.exists(os.path.join(directory, _MIGRATION_MARKER))
+
+
+def open_sharded_cache(directory: str, **settings) -> FanoutCache:
+    """A FanoutCache in `directory`, with the shard count it was created with (CACHE_SHARDS if new)."""
+    return FanoutCache(directory, shards=_shard_count(directory), timeout=CACHE_TIMEOUT, **settings)
+
+
+def _open_cache(directory: str) -> FanoutCache:
+    sharded = open_sharded_cache(directory)
+    if not _migrated(directory) and os.path.exists(os.path.join(directory, "cache.db")):
+        _migrate_single_cache(directory, sharded)
+    return sharded
+
+
+cache = _open_cache(CACHE_DIR)
 # Print cache statistics after loading
 try:
     item_count = len(cache)
@@ -28,11 +114,119 @@ try:
 except Exception as e:
     print(f"Could not retrieve cache statistics: {e}")
 
+def _size_of(value) -> int:
+    """Approximate in-memory size of a cached value (bytes and strings dominate)."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value) + 64
+    if isinstance(value, (tuple, list)):
+        return sum(_size_of(item) for item in value) + 64
+    if isinstance(value, dict):
+        return sum(_size_of(k) + _size_of(v) for k, v in value.items()) + 64
+    return sys.getsizeof(value)
+
+
+class TieredCache:
+    """
+    A bounded in-process LRU in front of the shared diskcache, for values that never change
+    once written under their key (memoized LLM/TTS results, audio clips). Reads go to memory
+    first and fill it from disk; writes go to both, so diskcache stays the durable layer.
+    Mutable, cross-process state (interview events, live markers) must bypass it; see interview_cache.
+    """
+
+    def __init__(self, disk, max_entries=MEMORY_CACHE_MAX_ENTRIES, max_bytes=MEMORY_CACHE_MAX_BYTES):
+        self.disk = disk
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = collections.Counter()
+
+    def _remember(self, key, value):
+        size = _size_of(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if self.max_entries <= 0 or size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["memory_evictions"] += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[0]
+        value = self.disk.get(key, default=ENOVAL, retry=True)
+        if value is ENOVAL:
+            with self._lock:
+                self._stats["misses"] += 1
+            return default
+        with self._lock:
+            self._stats["disk_hits"] += 1
+        self._remember(key, value)
+        return value
+
+    def set(self, key, value, expire=None):
+        self.disk.set(key, value, expire=expire, retry=True)
+        with self._lock:
+            self._stats["writes"] += 1
+        if expire is None:
+            self._remember(key, value)
+
+    def memoize(self):
+        """Like diskcache's memoize (same keys, so existing cache entries still hit), read through both tiers."""
+        def decorator(func):
+            base = (full_name(func),)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = wrapper.__cache_key__(*args, **kwargs)
+                result = self.get(key, default=ENOVAL)
+                if result is ENOVAL:
+                    result = func(*args, **kwargs)
+                    self.set(key, result)
+                return result
+
+            def __cache_key__(*args, **kwargs):
+                return args_to_key(base, args, kwargs, False, ())
+
+            wrapper.__cache_key__ = __cache_key__
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats.get("memory_hits", 0) + stats.get("disk_hits", 0) + stats.get("misses", 0)
+            return {
+                "memory": {"entries": len(self._entries), "bytes": self._bytes, "max_entries": self.max_entries,
+                           "max_bytes": self.max_bytes, "hits": stats.get("memory_hits", 0),
+                           "evictions": stats.get("memory_evictions", 0)},
+                "disk": {"hits": stats.get("disk_hits", 0), "misses": stats.get("misses", 0),
+                         "writes": stats.get("writes", 0)},
+                "hit_rate": round((lookups - stats.get("misses", 0)) / lookups, 3) if lookups else 0.0
+            }
+
+
+# Two-tier cache for memoized upstream results; see TieredCache.
+memo_cache = TieredCache(cache)
+
+# Interview events, checkpoints and live markers; see interview_store.py.
+interview_cache = open_sharded_cache(INTERVIEW_STORE_DIR, size_limit=INTERVIEW_STORE_SIZE_LIMIT)
+
+
 def create_cache_zip():
     temp_dir = tempfile.gettempdir()
     base_name = os.path.join(temp_dir, "cache_archive") # A more descriptive name
     archive_path = base_name + ".zip"
-    cache_directory = os.environ.get("CACHE_DIR", "/cache")
+    cache_directory = CACHE_DIR
     
     if not os.path.isdir(cache_directory):
         logging.error(f"Cache directory not found at {cache_directory}")
@@ -40,22 +234,29 @@ def create_cache_zip():
     
     logging.info("Forcing a cache checkpoint for safe backup...")
     try:
-        # Open and immediately close a connection.
-        # This forces SQLite to perform a checkpoint, merging the .wal file
-        # into the main .db file, ensuring the on-disk files are consistent.
-        with Cache(cache_directory) as temp_cache:
+        # Open and immediately close a connection to every shard.
+        # This forces SQLite to perform a checkpoint, merging each .wal file
+        # into its .db file, ensuring the on-disk files are consistent.
+        with FanoutCache(cache_directory, shards=_shard_count(cache_directory)) as temp_cache:
             temp_cache.close()
         
-        # Clean up temporary files before archiving.
-        tmp_path = os.path.join(cache_directory, 'tmp')
-        if os.path.isdir(tmp_path):
-            logging.info(f"Removing temporary cache directory: {tmp_path}")
-            shutil.rmtree(tmp_path)
+        # Clean up temporary files (one directory per shard) before archiving.
+        for shard in [cache_directory] + [os.path.join(cache_directory, name) for name in os.listdir(cache_directory)
+                                          if _SHARD_DIR.match(name)]:
+            tmp_path = os.path.join(shard, 'tmp')
+            if os.path.isdir(tmp_path):
+                logging.info(f"Removing temporary cache directory: {tmp_path}")
+                shutil.rmtree(tmp_path)
 
         logging.info(f"Checkpoint complete. Creating zip archive of {cache_directory} to {archive_path}")
         with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as zipf:
-            for root, _, files in os.walk(cache_directory):
+            for root, dirs, files in os.walk(cache_directory):
+                # The interview store holds patient data; it is never shipped.
+                dirs[:] = [name for name in dirs
+                           if os.path.realpath(os.path.join(root, name)) != os.path.realpath(INTERVIEW_STORE_DIR)]
                 for file in files:
+                    if any(fnmatch.fnmatch(file, pattern) for pattern in _ZIP_EXCLUDE):
+                        continue
                     file_path = os.path.join(root, file)
                     arcname = os.path.relpath(file_path, cache_directory)
                     zipf.write(file_path, arcname)
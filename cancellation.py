@@ -0,0 +1,189 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cooperative cancellation for interview simulations.
+
+Upstream LLM and TTS calls are blocking HTTP requests that cannot be interrupted.
+`run_cancellable` runs them on a shared pool of call threads and stops waiting as
+soon as the interview is cancelled. The abandoned call is left "parked": it still
+finishes in the background and, since the clients are memoized, its result lands
+in the cache for the next interview that needs it.
+
+A `Deadline` bounds the wait the same way: once it passes, DeadlineExceeded is
+raised and the caller degrades instead of blocking the interview.
+
+Both helpers run calls in a copy of the caller's context, so trace spans and the
+cancel token follow them to the pool. The optional process-wide upstream rate
+limit is taken by `acquire_upstream` where a request actually goes out to a
+provider, so cache hits never wait for it.
+"""
+
+import concurrent.futures
+import contextvars
+import logging
+import os
+import threading
+import time
+
+UPSTREAM_CALL_WORKERS = int(os.environ.get("UPSTREAM_CALL_WORKERS", 16))
+# Process-wide cap on upstream calls started per second; 0 disables it.
+UPSTREAM_RATE_LIMIT = float(os.environ.get("UPSTREAM_RATE_LIMIT", 0))
+# How often a waiting call re-checks its cancel token, in seconds.
+CANCEL_POLL_INTERVAL = 0.25
+
+_call_executor = concurrent.futures.ThreadPoolExecutor(max_workers=UPSTREAM_CALL_WORKERS,
+                                                       thread_name_prefix="upstream-call")
+# Cancel token of the interview a call belongs to, for waits on the rate limit.
+_upstream_cancel = contextvars.ContextVar("upstream_cancel", default=None)
+
+
+class InterviewCancelled(Exception):
+    """Raised inside an interview simulation once its cancel token is set."""
+    pass
+
+
+class CancelToken:
+    """A thread-safe flag used to ask a running interview to stop."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise InterviewCancelled(self.reason)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when an upstream call does not finish before its Deadline."""
+    pass
+
+
+class Deadline:
+    """A point in time by which a group of calls (e.g. one interview turn) should be done."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self._expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self._expires
+
+
+class RateLimiter:
+    """Token bucket shared by every thread of the process."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel: "CancelToken" = None):
+        """Blocks until a call may start (or raises InterviewCancelled once `cancel` is set)."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            time.sleep(min(wait, CANCEL_POLL_INTERVAL))
+
+
+_rate_limiter = RateLimiter(UPSTREAM_RATE_LIMIT) if UPSTREAM_RATE_LIMIT > 0 else None
+
+
+def set_upstream_rate_limit(rate: float, burst: int = 1):
+    """Caps the upstream calls started per second by this process (0 removes the cap)."""
+    global _rate_limiter
+    _rate_limiter = RateLimiter(rate, burst) if rate > 0 else None
+
+
+def acquire_upstream():
+    """
+    Waits for the upstream rate limit, if any. Called right before a request is sent to a
+    provider (i.e. on cache misses only); raises InterviewCancelled if the interview the
+    call belongs to is cancelled meanwhile.
+    """
+    limiter = _rate_limiter
+    if limiter is not None:
+        limiter.acquire(_upstream_cancel.get())
+
+
+def _submit(fn, args, kwargs, cancel=None) -> concurrent.futures.Future:
+    context = contextvars.copy_context()
+    if cancel is not None:
+        context.run(_upstream_cancel.set, cancel)
+    return _call_executor.submit(context.run, fn, *args, **kwargs)
+
+
+def submit_call(fn, *args, **kwargs) -> concurrent.futures.Future:
+    """Starts fn(*args, **kwargs) on the shared call pool and returns its future."""
+    return _submit(fn, args, kwargs)
+
+
+def wait_for(future: concurrent.futures.Future, cancel: CancelToken = None, deadline: Deadline = None):
+    """
+    Returns the result of a call started with submit_call, or raises InterviewCancelled
+    as soon as `cancel` is set, or DeadlineExceeded once `deadline` has passed (the
+    call itself keeps running, parked).
+    """
+    while True:
+        timeout = CANCEL_POLL_INTERVAL if deadline is None else min(CANCEL_POLL_INTERVAL, deadline.remaining())
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            if cancel is not None and cancel.is_cancelled:
+                logging.info("Abandoning in-flight upstream call (%s); it will finish in the background.",
+                             cancel.reason)
+                raise InterviewCancelled(cancel.reason)
+            if deadline is not None and deadline.expired:
+                logging.info("Upstream call missed its %ss deadline; it will finish in the background.",
+                             deadline.seconds)
+                raise DeadlineExceeded(f"missed the {deadline.seconds}s deadline")
+
+
+def run_cancellable(fn, *args, cancel: CancelToken = None, deadline: Deadline = None, **kwargs):
+    """
+    Calls fn(*args, **kwargs) and returns its result, or raises InterviewCancelled as
+    soon as `cancel` is set, or DeadlineExceeded once `deadline` has passed. A call whose
+    deadline has already passed is still started, and parked right away, so its result
+    is cached for the next attempt. Without a token or deadline the call simply runs on
+    the current thread.
+    """
+    if cancel is None and deadline is None:
+        return fn(*args, **kwargs)
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    return wait_for(_submit(fn, args, kwargs, cancel), cancel, deadline)
@@ -0,0 +1,124 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Convergence detection for simulated interviews.
+
+After every report update the detector measures how much new information the
+answers it covers brought to the findings (terms from the patient's answers
+that the report picked up) and the report sections (terms a section has never
+contained before). Patience and the minimum are counted in answered turns, so
+with a report only every n answers an update counts for all n of them.
+Once several consecutive turns add nothing new, the interview has converged and
+can be closed early instead of running to the question limit.
+"""
+
+import os
+import re
+
+# Consecutive no-information turns before an interview is ended; 0 disables the detector.
+CONVERGENCE_PATIENCE = int(os.environ.get("INTERVIEW_CONVERGENCE_PATIENCE", 0))
+# Never end an interview before this many Q&A turns.
+CONVERGENCE_MIN_TURNS = int(os.environ.get("INTERVIEW_CONVERGENCE_MIN_TURNS", 6))
+# A turn counts as informative if it introduces at least this many new report terms.
+CONVERGENCE_MIN_NEW_TERMS = int(os.environ.get("INTERVIEW_CONVERGENCE_MIN_NEW_TERMS", 2))
+
+_STOPWORDS = {
+    "about", "after", "again", "also", "been", "before", "being", "both", "but", "does", "doing",
+    "down", "during", "each", "feel", "feels", "felt", "from", "have", "having", "into", "just",
+    "know", "like", "little", "more", "most", "much", "only", "other", "over", "really", "reports",
+    "same", "some", "such", "than", "that", "their", "them", "then", "there", "these", "they",
+    "thing", "think", "this", "those", "through", "very", "were", "what", "when", "where", "which",
+    "while", "with", "would", "your", "yeah", "well", "patient", "states", "notes", "denies",
+}
+
+_HEADING = re.compile(r"^\s*(?:#+\s*(.+?)\s*:?\s*$|\*\*(.+?)\*\*\s*:?\s*$)")
+
+
+def content_terms(text: str) -> set[str]:
+    """Lower-cased content words and numeric tokens of a text."""
+    words = re.findall(r"[a-z][a-z\-']{3,}|\w*\d\w*", (text or "").lower())
+    return {w.strip("-'") for w in words if w not in _STOPWORDS}
+
+
+def report_sections(report: str) -> dict[str, set[str]]:
+    """Splits a Markdown report into {section title: content terms}."""
+    sections = {}
+    title = ""
+    for line in (report or "").splitlines():
+        heading = _HEADING.match(line)
+        if heading:
+            title = (heading.group(1) or heading.group(2)).strip().rstrip(":").lower()
+            sections.setdefault(title, set())
+        else:
+            sections.setdefault(title, set()).update(content_terms(line))
+    return sections
+
+
+class ConvergenceDetector:
+    """
+    Tracks per-turn information gain. `state` is a plain dict so it can be stored
+    in the interview checkpoint and restored on resume.
+    """
+
+    def __init__(self, patience=CONVERGENCE_PATIENCE, min_turns=CONVERGENCE_MIN_TURNS,
+                 min_new_terms=CONVERGENCE_MIN_NEW_TERMS, state=None):
+        self.patience = patience
+        self.min_turns = min_turns
+        self.min_new_terms = min_new_terms
+        self.state = state if state is not None else {
+            "turns": 0,
+            "stale_turns": 0,
+            "finding_terms": set(),
+            "section_terms": {}
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.patience > 0
+
+    def update(self, answer_text: str, report_text: str, turns: int = 1) -> dict:
+        """
+        Records a report update covering `turns` Q&A turns (their answers in `answer_text`)
+        and returns what it added:
+        {"new_findings": [...], "changed_sections": {title: [new terms]}, "informative": bool}
+        """
+        state = self.state
+        state["turns"] += turns
+
+        sections = report_sections(report_text)
+        report_terms = set().union(*sections.values()) if sections else set()
+        new_findings = (content_terms(answer_text) & report_terms) - state["finding_terms"]
+        state["finding_terms"] |= new_findings
+
+        changed_sections = {}
+        for title, terms in sections.items():
+            new_terms = terms - state["section_terms"].get(title, set())
+            if new_terms:
+                changed_sections[title] = sorted(new_terms)
+            state["section_terms"][title] = state["section_terms"].get(title, set()) | terms
+
+        new_report_terms = sum(len(terms) for terms in changed_sections.values())
+        informative = bool(new_findings) or new_report_terms >= self.min_new_terms
+        state["stale_turns"] = 0 if informative else state["stale_turns"] + turns
+        return {
+            "new_findings": sorted(new_findings),
+            "changed_sections": changed_sections,
+            "informative": informative
+        }
+
+    @property
+    def converged(self) -> bool:
+        return (self.enabled and self.state["turns"] >= self.min_turns
+                and self.state["stale_turns"] >= self.patience)
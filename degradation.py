@@ -0,0 +1,81 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per-turn deadlines and the degraded responses used when a turn runs late.
+
+Every interview turn gets TURN_DEADLINE_SECONDS for all of its upstream calls.
+A call still running when the deadline passes (or started after it) is parked:
+it finishes in the background and fills the cache, and the turn carries on
+without it:
+
+    tts          audio_skipped         the line is sent without audio
+    interviewer  canned_question       a generic follow-up question is asked (never as
+                                       the opening question, which is waited for)
+    patient      cached_answer         an answer already cached for this prompt is used
+                 canned_answer         otherwise a generic answer is shown; it is kept
+                                       out of the transcript, report and checkpoint, and
+                                       the question is asked again in a turn of its own
+    report       report_reused         the last report stands; the new answers
+                                       are folded into the next update
+    thinking     thinking_skipped      the thinking summary is dropped
+
+Each degradation is sent to the client as a "degraded" event and counted here.
+"""
+
+import collections
+import os
+import threading
+
+# Seconds all upstream calls of one interview turn may take; 0 disables the deadline.
+TURN_DEADLINE_SECONDS = float(os.environ.get("TURN_DEADLINE_SECONDS", 60))
+
+CANNED_INTERVIEWER_QUESTION = "Could you tell me a bit more about that?"
+CANNED_PATIENT_ANSWER = "I'm not really sure how to describe it. It's hard to say."
+# Canned patient answers per interview that do not use up a turn; later ones do.
+MAX_UNCOUNTED_CANNED_ANSWERS = int(os.environ.get("MAX_UNCOUNTED_CANNED_ANSWERS", 3))
+
+
+class DegradationStats:
+    """Process-wide counters of degraded turns, by stage and by action."""
+
+    def __init__(self):
+        self._by_stage = collections.Counter()
+        self._by_action = collections.Counter()
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, action: str):
+        with self._lock:
+            self._by_stage[stage] += 1
+            self._by_action[action] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "turn_deadline_s": TURN_DEADLINE_SECONDS,
+                "total": sum(self._by_action.values()),
+                "by_stage": dict(self._by_stage),
+                "by_action": dict(self._by_action)
+            }
+
+
+# Singleton instance
+_degradation_stats = None
+
+def get_degradation_stats():
+    """Get or create the degradation counters"""
+    global _degradation_stats
+    if _degradation_stats is None:
+        _degradation_stats = DegradationStats()
+    return _degradation_stats
@@ -0,0 +1,165 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Deterministic, LLM-free digest of a patient's FHIR record.
+
+Raw FHIR JSON is mostly structure (systems, codings, profiles, narrative HTML).
+build_fhir_digest keeps only the clinically relevant facts (demographics,
+conditions, medications, allergies, encounters and observations) as a short
+text block that can go straight into a prompt or feed a much smaller
+summarization call.
+"""
+
+# Resource types that carry no clinical facts for the digest.
+_IGNORED_RESOURCES = {"Practitioner", "Organization", "Medication"}
+
+
+def fhir_resources(fhir_record) -> list[dict]:
+    """Flattens a FHIR Bundle, a list of resources, or a single resource into a list of resources."""
+    if isinstance(fhir_record, list):
+        resources = []
+        for item in fhir_record:
+            resources.extend(fhir_resources(item))
+        return resources
+    if not isinstance(fhir_record, dict):
+        return []
+    if fhir_record.get("resourceType") == "Bundle":
+        return [entry["resource"] for entry in fhir_record.get("entry", []) if "resource" in entry]
+    return [fhir_record]
+
+
+def _concept_text(concept) -> str:
+    """Human-readable text of a CodeableConcept (its text, else the first coding display)."""
+    if not concept:
+        return ""
+    if isinstance(concept, list):
+        return ", ".join(filter(None, (_concept_text(c) for c in concept)))
+    if concept.get("text"):
+        return concept["text"]
+    for coding in concept.get("coding", []):
+        if coding.get("display") or coding.get("code"):
+            return coding.get("display") or coding.get("code")
+    return ""
+
+
+def _date(value) -> str:
+    return (value or "")[:10]
+
+
+def _quantity(quantity) -> str:
+    if not quantity or "value" not in quantity:
+        return ""
+    return f"{quantity['value']} {quantity.get('unit', '')}".strip()
+
+
+def _patient_line(resource) -> str:
+    name = resource.get("name", [{}])[0]
+    full_name = " ".join(name.get("given", []) + [name.get("family", "")]).strip()
+    # No computed age: the digest must not change from one day to the next.
+    born = _date(resource.get("birthDate"))
+    return "Patient: " + _with_details(full_name, [resource.get("gender"), f"born {born}" if born else None])
+
+
+def _condition_line(resource) -> str:
+    details = [_concept_text(resource.get("clinicalStatus")) or None,
+               _concept_text(resource.get("severity")) or None]
+    onset = _date(resource.get("onsetDateTime") or resource.get("recordedDate"))
+    if onset:
+        details.append(f"since {onset}")
+    return _with_details(_concept_text(resource.get("code")), details)
+
+
+def _medication_line(resource, medications) -> str:
+    name = _concept_text(resource.get("medicationCodeableConcept"))
+    if not name and resource.get("medicationReference"):
+        name = medications.get(resource["medicationReference"].get("reference"), "")
+        name = name or resource["medicationReference"].get("display", "")
+    dosage = "; ".join(filter(None, (d.get("text") for d in resource.get("dosageInstruction", resource.get("dosage", [])))))
+    started = _date(resource.get("authoredOn") or (resource.get("effectivePeriod") or {}).get("start"))
+    return _with_details(name, [dosage, resource.get("status"), f"since {started}" if started else None])
+
+
+def _allergy_line(resource) -> str:
+    reactions = [_concept_text(manifestation)
+                 for reaction in resource.get("reaction", [])
+                 for manifestation in reaction.get("manifestation", [])]
+    return _with_details(_concept_text(resource.get("code")),
+                         [resource.get("criticality"), "reaction: " + ", ".join(reactions) if reactions else None])
+
+
+def _encounter_line(resource, conditions) -> str:
+    reason = _concept_text(resource.get("reasonCode"))
+    if not reason:
+        reason = ", ".join(filter(None, (conditions.get(r.get("reference"), "") for r in resource.get("reasonReference", []))))
+    kind = _concept_text(resource.get("type")) or (resource.get("class") or {}).get("display", "Encounter")
+    return _with_details(f"{_date((resource.get('period') or {}).get('start'))} {kind}".strip(),
+                         [f"reason: {reason}" if reason else None])
+
+
+def _observation_line(resource) -> str:
+    value = _quantity(resource.get("valueQuantity")) or resource.get("valueString") or _concept_text(resource.get("valueCodeableConcept"))
+    if not value and resource.get("component"):
+        values = [_quantity(c.get("valueQuantity")) for c in resource["component"]]
+        value = "/".join(v.split(" ")[0] for v in values if v)
+        unit = next((v.split(" ", 1)[1] for v in values if " " in v), "")
+        value = f"{value} {unit}".strip()
+    effective = _date(resource.get("effectiveDateTime"))
+    return f"{_concept_text(resource.get('code'))}: {value or 'no value'}" + (f" ({effective})" if effective else "")
+
+
+def _with_details(name: str, details: list) -> str:
+    details = [d for d in details if d]
+    return f"{name} ({', '.join(details)})" if details else name
+
+
+def build_fhir_digest(fhir_record) -> str:
+    """Returns a compact plain-text digest of a FHIR record; no LLM involved and the same output for the same record."""
+    resources = fhir_resources(fhir_record)
+    references = {}
+    for resource in resources:
+        for key in (f"{resource.get('resourceType')}/{resource.get('id')}", f"urn:uuid:{resource.get('id')}"):
+            references[key] = _concept_text(resource.get("code"))
+    # Bundles reference resources by fullUrl as well.
+    if isinstance(fhir_record, dict):
+        for entry in fhir_record.get("entry", []):
+            if entry.get("fullUrl") and "resource" in entry:
+                references[entry["fullUrl"]] = _concept_text(entry["resource"].get("code"))
+
+    sections = {"Patient": [], "Conditions": [], "Medications": [], "Allergies": [], "Encounters": [], "Observations": []}
+    for resource in resources:
+        kind = resource.get("resourceType")
+        if kind == "Patient":
+            sections["Patient"].append(_patient_line(resource))
+        elif kind == "Condition":
+            sections["Conditions"].append(_condition_line(resource))
+        elif kind in ("MedicationRequest", "MedicationStatement"):
+            sections["Medications"].append(_medication_line(resource, references))
+        elif kind == "AllergyIntolerance":
+            sections["Allergies"].append(_allergy_line(resource))
+        elif kind == "Encounter":
+            sections["Encounters"].append(_encounter_line(resource, references))
+        elif kind == "Observation":
+            sections["Observations"].append(_observation_line(resource))
+        elif kind not in _IGNORED_RESOURCES:
+            text = _concept_text(resource.get("code"))
+            if text:
+                sections.setdefault("Other", []).append(f"{kind}: {text}")
+
+    lines = list(sections.pop("Patient"))
+    for title, items in sections.items():
+        if items:
+            lines.append(f"{title}:")
+            lines.extend(f"- {item}" for item in items)
+    return "\n".join(lines)
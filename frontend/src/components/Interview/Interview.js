@@ -21,6 +21,28 @@ import { diffArrays, diffWords } from "diff";
 import "./Interview.css";
 import DetailsPopup from "../DetailsPopup/DetailsPopup";
 
+// Applies the line operations of a report delta event: ["=", n] keeps n lines,
+// ["-", n] drops n lines and ["+", lines] inserts lines.
+const applyReportOps = (text, ops) => {
+  const oldLines = text.split("\n");
+  const newLines = [];
+  let position = 0;
+  for (const [op, arg] of ops) {
+    if (op === "=") {
+      newLines.push(...oldLines.slice(position, position + arg));
+      position += arg;
+    } else if (op === "-") {
+      position += arg;
+    } else if (op === "+") {
+      newLines.push(...arg);
+    }
+  }
+  return newLines.join("\n");
+};
+
+// Reconnects after consecutive stream errors before the interview is given up.
+const MAX_STREAM_RECONNECTS = 5;
+
 const Interview = ({ selectedPatient, selectedCondition, onBack }) => {
   const [messages, setMessages] = useState([]);
   const [isInterviewComplete, setIsInterviewComplete] = useState(false);
@@ -33,11 +55,15 @@ const Interview = ({ selectedPatient, selectedCondition, onBack }) => {
   const [waitTime, setWaitTime] = useState(3000);
   const [showEvaluationInfoPopup, setShowEvaluationInfoPopup] = useState(false);
   const [isDetailsPopupOpen, setIsDetailsPopupOpen] = useState(false);
+  const [queuePosition, setQueuePosition] = useState(0);
+  const [qualityLevel, setQualityLevel] = useState(null);
+  const [streamError, setStreamError] = useState(null);
   const chatContainerRef = useRef(null);
   const reportContentRef = useRef(null);
   const lastMessageRef = useRef(null);
   const messageQueue = useRef([]);
   const eventSourceRef = useRef(null);
+  const reportStateRef = useRef({ version: 0, text: "" });
   const timeoutIdRef = useRef(null);
 
   const currentPlayingAudio = useRef(null); // To keep track of the currently playing audio instance
@@ -67,7 +93,10 @@ const Interview = ({ selectedPatient, selectedCondition, onBack }) => {
 
     const nextMessage = messageQueue.current.shift();
 
-    setMessages((prev) => [...prev, nextMessage]);
+    // Audio chunks only continue the playback of the line before them.
+    if (!nextMessage.audioOnly) {
+      setMessages((prev) => [...prev, nextMessage]);
+    }
 
     if (nextMessage.audio && isAudioEnabledRef.current) {
       if (currentPlayingAudio.current) {
@@ -91,6 +120,8 @@ const Interview = ({ selectedPatient, selectedCondition, onBack }) => {
         currentPlayingAudio.current = null;
         processQueue();
       });
+    } else if (nextMessage.audioOnly) {
+      timeoutIdRef.current = setTimeout(processQueue, 0);
     } else {
       // For non-audio, schedule the next processing call with a fixed delay
       // to simulate reading time. This will call processQueue again, which will
@@ -104,6 +135,10 @@ const Interview = ({ selectedPatient, selectedCondition, onBack }) => {
 
     setMessages([]);
     setIsInterviewComplete(false);
+    setQueuePosition(0);
+    setQualityLevel(null);
+    setStreamError(null);
+    reportStateRef.current = { version: 0, text: "" };
     messageQueue.current = [];
     if (currentPlayingAudio.current) {
       currentPlayingAudio.current.pause();
@@ -114,16 +149,31 @@ const Interview = ({ selectedPatient, selectedCondition, onBack }) => {
       window.location.origin === "http://localhost:3000"
         ? "http://localhost:7860"
         : "";
+    // On slow connections the server sends lower-bitrate audio, which starts playing sooner.
+    const downlink = navigator.connection && navigator.connection.downlink;
     const url = `${baseURL}/api/stream_conversation?patient=${encodeURIComponent(
       selectedPatient.name
-    )}&condition=${encodeURIComponent(selectedCondition)}`;
+    )}&condition=${encodeURIComponent(selectedCondition)}&report_mode=delta${
+      downlink ? `&bandwidth=${downlink}` : ""
+    }`;
     const eventSource = new EventSource(url);
     eventSourceRef.current = eventSource;
+    let reconnects = 0;
 
     eventSource.onmessage = (event) => {
+      reconnects = 0;
       try {
         const data = JSON.parse(event.data);
 
+        // The server rejected (e.g. too busy) or gave up on the interview; do not reconnect.
+        if (data && data.event === 'error') {
+          console.error(`Interview stream error (${data.reason}): ${data.error}`);
+          eventSource.close();
+          setStreamError(data);
+          processQueue();
+          return;
+        }
+
         // Check if the parsed object is our special 'end' signal
         if (data && data.event === 'end') {
           console.log("Server signaled end of stream. Closing connection.");
@@ -131,6 +181,39 @@ const Interview = ({ selectedPatient, selectedCondition, onBack }) => {
           processQueue();
           return; 
         }        
+        // The interview is waiting for a free simulation slot on the server.
+        if (data && data.event === 'queued') {
+          setQueuePosition(data.position);
+          return;
+        }
+        setQueuePosition(0);
+        // Under heavy load the server shortens the interview; it says so up front.
+        if (data && data.event === 'quality') {
+          setQualityLevel(data);
+          return;
+        }
+        // A late upstream call was replaced by a degraded response (e.g. no audio for a line).
+        if (data && data.event === 'degraded') {
+          console.info(`Turn ${data.turn}: ${data.stage} degraded (${data.action}).`);
+          return;
+        }
+        // Long lines are spoken in chunks; later chunks follow the line's own event.
+        if (data && data.event === 'audio_chunk') {
+          data.audioOnly = true;
+        }
+        // Report updates arrive as line deltas against the previous version,
+        // with a full snapshot every few versions.
+        if (data && data.speaker === "report" && data.version) {
+          const reportState = reportStateRef.current;
+          if (data.ops) {
+            if (data.base !== reportState.version) {
+              console.warn(`Skipping report delta ${data.version}: have version ${reportState.version}.`);
+              return;
+            }
+            data.text = applyReportOps(reportState.text, data.ops);
+          }
+          reportStateRef.current = { version: data.version, text: data.text };
+        }
         messageQueue.current.push(data);
         // Always call processQueue after pushing a message, unless audio or timeout is active
         if (!currentPlayingAudio.current && !timeoutIdRef.current) {
@@ -142,8 +225,19 @@ const Interview = ({ selectedPatient, selectedCondition, onBack }) => {
     };
 
     eventSource.onerror = (err) => {
-      console.error("EventSource failed:", err);
-      eventSource.close();
+      // While the connection is only interrupted the browser reconnects on its own,
+      // sending the last event id so the server resumes the interview from there.
+      if (eventSource.readyState === EventSource.CLOSED) {
+        console.error("EventSource failed:", err);
+        setStreamError({ reason: "connection_failed" });
+      } else if (++reconnects > MAX_STREAM_RECONNECTS) {
+        console.error(`EventSource still failing after ${MAX_STREAM_RECONNECTS} reconnects; giving up.`, err);
+        eventSource.close();
+        setStreamError({ reason: "connection_failed" });
+        processQueue();
+      } else {
+        console.warn("EventSource connection lost, reconnecting...", err);
+      }
     };
 
 
@@ -377,9 +471,22 @@ const Interview = ({ selectedPatient, selectedCondition, onBack }) => {
                 
               </div>
               <div className="chat-container" ref={chatContainerRef}>
-                {messages.length === 0 ? (
+                {qualityLevel && qualityLevel.level > 0 && (
                   <div className="chat-waiting-indicator">
+                    High demand right now: this interview runs in {qualityLevel.name.replace("_", "-")} mode.
+                  </div>
+                )}
+                {streamError && (
+                  <div className="chat-waiting-indicator">
+                    {streamError.retry_after
+                      ? `The server is busy right now. Please try again in ${streamError.retry_after} seconds.`
+                      : "The interview could not be continued. Please try again later."}
+                  </div>
+                )}
+                {messages.length === 0 ? (
+                  !streamError && <div className="chat-waiting-indicator">
                     Waiting for the interview to start...
+                    {queuePosition > 0 && ` (position ${queuePosition} in queue)`}
                   </div>
                 ) : (
                   messages
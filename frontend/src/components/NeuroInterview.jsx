@@ -2,6 +2,9 @@ import React, { useState, useEffect } from 'react';
 import { Brain, Activity, AlertCircle, FileText } from 'lucide-react';
 import NeuroSketch from './NeuroSketch';
 
+// Reconnect attempts in a row, without a message in between, before giving up on the stream.
+const MAX_STREAM_RECONNECTS = 5;
+
 /**
  * NeuroInterview Component
  * Integrates the neurological interview with real-time NeuroSketch localization
@@ -12,32 +15,42 @@ const NeuroInterview = ({ patient, condition }) => {
   const [showNeuroSketch, setShowNeuroSketch] = useState(true);
   const [interviewComplete, setInterviewComplete] = useState(false);
   const [report, setReport] = useState('');
+  const [streamError, setStreamError] = useState(null);
 
-  // Stream interview conversation
+  // Stream interview conversation. Localization events arrive on the same stream
+  // after each patient answer, so NeuroSketch updates without extra requests.
   useEffect(() => {
     if (!patient || !condition) return;
 
+    setMessages([]);
+    setCurrentFindings('');
+    setReport('');
+    setInterviewComplete(false);
+    setStreamError(null);
     const eventSource = new EventSource(
-      `/api/stream_conversation?patient=${encodeURIComponent(patient)}&condition=${encodeURIComponent(condition)}`
+      `/api/neuro/stream_conversation?patient=${encodeURIComponent(patient)}&condition=${encodeURIComponent(condition)}`
     );
+    let reconnects = 0;
 
     eventSource.onmessage = (event) => {
+      reconnects = 0;
       try {
         const data = JSON.parse(event.data);
-        
-        if (data.type === 'message') {
-          setMessages(prev => [...prev, data]);
-          
-          // Extract findings from patient responses
-          if (data.role === 'patient') {
-            extractFindings([...messages, data]);
-          }
-        } else if (data.type === 'report') {
-          setReport(data.content);
-          setInterviewComplete(true);
-        } else if (data.type === 'complete') {
+
+        // The server rejected (e.g. too busy) or gave up on the interview; do not reconnect.
+        if (data.event === 'error') {
+          console.error(`Interview stream error (${data.reason}): ${data.error}`);
+          eventSource.close();
+          setStreamError(data);
+        } else if (data.event === 'end') {
           setInterviewComplete(true);
           eventSource.close();
+        } else if (data.event === 'localization') {
+          setCurrentFindings(data.findings_text);
+        } else if (data.speaker === 'interviewer' || data.speaker === 'patient') {
+          setMessages(prev => [...prev, { role: data.speaker, content: data.text }]);
+        } else if (data.speaker === 'report') {
+          setReport(data.text);
         }
       } catch (error) {
         console.error('Error parsing message:', error);
@@ -45,8 +58,15 @@ const NeuroInterview = ({ patient, condition }) => {
     };
 
     eventSource.onerror = (error) => {
-      console.error('EventSource error:', error);
-      eventSource.close();
+      // The browser reconnects on its own (resuming from the last event id) unless the stream is closed.
+      if (eventSource.readyState === EventSource.CLOSED) {
+        console.error('EventSource error:', error);
+        setStreamError({ reason: 'connection_failed' });
+      } else if (++reconnects > MAX_STREAM_RECONNECTS) {
+        console.error(`EventSource still failing after ${MAX_STREAM_RECONNECTS} reconnects; giving up.`, error);
+        eventSource.close();
+        setStreamError({ reason: 'connection_failed' });
+      }
     };
 
     return () => {
@@ -54,49 +74,6 @@ const NeuroInterview = ({ patient, condition }) => {
     };
   }, [patient, condition]);
 
-  // Extract neurological findings from interview messages
-  const extractFindings = async (msgs) => {
-    try {
-      const response = await fetch('/api/neuro/extract_interview_findings', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ messages: msgs }),
-      });
-
-      const data = await response.json();
-      
-      // Convert structured findings back to text for NeuroSketch
-      const findingsText = formatFindingsAsText(data);
-      setCurrentFindings(findingsText);
-    } catch (error) {
-      console.error('Error extracting findings:', error);
-    }
-  };
-
-  // Format structured findings as text for NeuroSketch input
-  const formatFindingsAsText = (findings) => {
-    const parts = [];
-
-    // Add cranial nerve findings
-    findings.cranialNerves?.forEach(cn => {
-      parts.push(`${cn.side} ${cn.name.toLowerCase()} nerve (${cn.cn})`);
-    });
-
-    // Add tract findings
-    findings.tracts?.forEach(tract => {
-      parts.push(`${tract.side} ${tract.name.toLowerCase()}`);
-    });
-
-    // Add additional findings
-    findings.additional?.forEach(finding => {
-      parts.push(`${finding.side} ${finding.name.toLowerCase()}`);
-    });
-
-    return parts.join(', ');
-  };
-
   return (
     <div className="min-h-screen bg-gradient-to-br from-blue-50 via-white to-purple-50 p-6">
       <div className="max-w-7xl mx-auto">
@@ -128,13 +105,22 @@ const NeuroInterview = ({ patient, condition }) => {
             </div>
 
             <div className="p-6 h-[600px] overflow-y-auto">
+              {streamError && (
+                <div className="mb-4 p-4 rounded-lg bg-red-50 border border-red-200 text-sm text-red-800">
+                  {streamError.retry_after
+                    ? `The server is busy right now. Please try again in ${streamError.retry_after} seconds.`
+                    : 'The interview could not be continued. Please try again later.'}
+                </div>
+              )}
               {messages.length === 0 ? (
-                <div className="flex items-center justify-center h-full text-gray-400">
-                  <div className="text-center">
-                    <Brain className="w-16 h-16 mx-auto mb-4 opacity-30" />
-                    <p>Starting neurological assessment...</p>
+                !streamError && (
+                  <div className="flex items-center justify-center h-full text-gray-400">
+                    <div className="text-center">
+                      <Brain className="w-16 h-16 mx-auto mb-4 opacity-30" />
+                      <p>Starting neurological assessment...</p>
+                    </div>
                   </div>
-                </div>
+                )
               ) : (
                 <div className="space-y-4">
                   {messages.map((msg, idx) => (
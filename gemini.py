@@ -14,12 +14,14 @@
 
 import os
 import requests
-from cache import cache  # new import replacing duplicate cache initialization
+from cache import memo_cache  # new import replacing duplicate cache initialization
+from tracing import span
+from cancellation import acquire_upstream
 
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 
 # Decorate the function to cache its results indefinitely.
-@cache.memoize()
+@memo_cache.memoize()
 def gemini_get_text_response(prompt: str,
                                     stop_sequences: list = None,
                                     temperature: float = 0.1,
@@ -54,6 +56,10 @@ def gemini_get_text_response(prompt: str,
         }
     }
 
-    response = requests.post(api_url, headers=headers, json=data)
+    # Only cache misses reach this point: they alone take the upstream rate limit,
+    # and the span marks a real upstream request.
+    acquire_upstream()
+    with span("gemini.request", max_output_tokens=max_output_tokens):
+        response = requests.post(api_url, headers=headers, json=data, timeout=60)
     response.raise_for_status()  # Raise an exception for bad status codes
     return response.json()["candidates"][0]["content"]["parts"][0]["text"]
\ No newline at end of file
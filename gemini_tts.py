@@ -14,25 +14,42 @@
 
 import google.generativeai as genai
 import os
+import hashlib
 import struct
+import io
+import wave
 import re
 import logging
-from cache import cache
+from cache import cache, memo_cache
+from tracing import span
+from cancellation import acquire_upstream
+from tts_executor import get_tts_executor
 
-# Add these imports for MP3 conversion
-from pydub import AudioSegment
-import io
+from audio_encoder import encode_audio, concat_audio, codec_for_mime_type, CODEC_MIME_TYPES
+from pcm_processing import process_pcm, segment_offsets
 
 # --- Constants ---
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 GENERATE_SPEECH = os.environ.get("GENERATE_SPEECH", "false").lower() == "true"
 TTS_MODEL = "gemini-2.5-flash-preview-tts"
 DEFAULT_RAW_AUDIO_MIME = "audio/L16;rate=24000"
+# Chunked synthesis: sentences after the first are merged up to this many characters per request.
+TTS_CHUNK_MIN_CHARS = int(os.environ.get("TTS_CHUNK_MIN_CHARS", 80))
+# Phrase reuse: a sentence of at least TTS_PHRASE_MIN_CHARS that has been part of
+# TTS_PHRASE_MIN_REPEATS synthesized lines is synthesized once on its own and stitched in.
+TTS_PHRASE_REUSE = os.environ.get("TTS_PHRASE_REUSE", "true").lower() == "true"
+TTS_PHRASE_MIN_REPEATS = int(os.environ.get("TTS_PHRASE_MIN_REPEATS", 2))
+TTS_PHRASE_MIN_CHARS = int(os.environ.get("TTS_PHRASE_MIN_CHARS", 24))
+# Seconds a sentence's repeat count is kept after it was last spoken.
+TTS_PHRASE_SEEN_TTL = int(os.environ.get("TTS_PHRASE_SEEN_TTL", 30 * 24 * 60 * 60))
+# Control phrases the LLMs are told to print, which are never spoken.
+TTS_CONTROL_PHRASES = ("End interview.",)
 
 # --- Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-genai.configure(api_key=GEMINI_API_KEY)
+# REST rather than gRPC: gRPC calls would block the whole gevent worker (see Dockerfile).
+genai.configure(api_key=GEMINI_API_KEY, transport="rest")
 
 class TTSGenerationError(Exception):
     """Custom exception for TTS generation failures."""
@@ -87,14 +104,55 @@ def convert_to_wav(audio_data: bytes, mime_type: str) -> bytes:
         bits_per_sample, b"data", data_size
     )
     return header + audio_data
+
+def postprocessed_wav(audio_data: bytes, mime_type: str) -> bytes:
+    """Trims, normalizes and (optionally) downsamples raw PCM, then wraps it as WAV."""
+    parameters = parse_audio_mime_type(mime_type)
+    with span("tts.pcm_postprocess", pcm_bytes=len(audio_data)):
+        pcm, rate = process_pcm(audio_data, parameters["rate"], parameters["bits_per_sample"])
+    return convert_to_wav(pcm, f"audio/L{parameters['bits_per_sample']};rate={rate}")
 # --- End of helper functions ---
 
-def _synthesize_gemini_tts_impl(text: str, gemini_voice_name: str) -> tuple[bytes, str]:
+def normalize_tts_text(text: str) -> str:
+    """The spoken content of `text`: control phrases removed, quotes and whitespace unified."""
+    for phrase in TTS_CONTROL_PHRASES:
+        text = text.replace(phrase, " ")
+    text = text.translate(str.maketrans({"\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"'}))
+    return re.sub(r"\s+", " ", text).strip()
+
+def tts_cache_key(voice: str, style_id: str, text: str) -> tuple:
+    """Canonical key of a spoken line: independent of the style prompt's wording and of whitespace."""
+    return ("tts", voice, style_id, normalize_tts_text(text))
+
+def split_into_chunks(text: str, min_chars: int = TTS_CHUNK_MIN_CHARS) -> list[str]:
     """
-    Synthesizes English text using the Gemini API via the google-genai library.
-    Returns a tuple: (processed_audio_data_bytes, final_mime_type).
-    Raises TTSGenerationError on failure.
+    Splits text at sentence boundaries for chunked synthesis. The first sentence is
+    its own chunk so audio can start early; later sentences are merged into chunks of
+    at least `min_chars` characters to keep the number of requests down.
     """
+    sentences = [sentence for sentence in re.split(r'(?<=[.!?])\s+', text.strip()) if sentence]
+    if not sentences:
+        return []
+    chunks = [sentences[0]]
+    current = ""
+    for sentence in sentences[1:]:
+        current = f"{current} {sentence}" if current else sentence
+        if len(current) >= min_chars:
+            chunks.append(current)
+            current = ""
+    if current:
+        if len(chunks) > 1 and len(current) < min_chars // 2:
+            chunks[-1] = f"{chunks[-1]} {current}"  # Avoid a short trailing request.
+        else:
+            chunks.append(current)
+    return chunks
+
+def new_tts_model():
+    """Creates a TTS model client; each TTS executor worker keeps one for its lifetime."""
+    return genai.GenerativeModel(TTS_MODEL)
+
+def _request_speech(contents: str, speech_config: dict, **span_attributes) -> tuple[bytes, str]:
+    """Sends one TTS request; returns the raw audio and its MIME type. Raises TTSGenerationError."""
     if not GENERATE_SPEECH:
         # This should ideally not be hit if the logic outside this function is correct,
         # but as a safeguard, we raise an error.
@@ -102,24 +160,24 @@ def _synthesize_gemini_tts_impl(text: str, gemini_voice_name: str) -> tuple[byte
             "GENERATE_SPEECH is not set. Please set it in your environment variables to generate speech."
         )
 
-    try:
-        model = genai.GenerativeModel(TTS_MODEL)
-
-        generation_config = {
-            "response_modalities": ["AUDIO"],
-            "speech_config": {
-                "voice_config": {
-                    "prebuilt_voice_config": {
-                        "voice_name": gemini_voice_name
-                    }
-                }
-            }
-        }
+    generation_config = {
+        "response_modalities": ["AUDIO"],
+        "speech_config": speech_config
+    }
 
-        response = model.generate_content(
-            contents=[text],
-            generation_config=generation_config,
-        )
+    def generate(model):
+        with span("tts.request", chars=len(contents), **span_attributes):
+            return model.generate_content(
+                contents=[contents],
+                generation_config=generation_config,
+                request_options={"timeout": 60},
+            )
+
+    # Only cache misses reach this point; cached clips never wait for the upstream rate limit.
+    acquire_upstream()
+    try:
+        # Queued on the TTS executor, which bounds concurrency and serves live audio first.
+        response = get_tts_executor().run(generate)
 
         audio_part = response.candidates[0].content.parts[0]
         audio_data_bytes = audio_part.inline_data.data
@@ -133,32 +191,28 @@ def _synthesize_gemini_tts_impl(text: str, gemini_voice_name: str) -> tuple[byte
         error_message = "No audio data was successfully retrieved or decoded."
         logging.error(error_message)
         raise TTSGenerationError(error_message)
+    return audio_data_bytes, final_mime_type
 
-    # --- Audio processing ---
+def _to_wav(audio_data_bytes: bytes, final_mime_type: str) -> tuple[bytes, str]:
+    """Post-processes raw PCM into WAV; audio that is already in a container format is kept."""
     if final_mime_type:
         final_mime_type_lower = final_mime_type.lower()
         needs_wav_conversion = any(p in final_mime_type_lower for p in ("audio/l16", "audio/l24", "audio/l8")) or \
                                not final_mime_type_lower.startswith(("audio/wav", "audio/mpeg", "audio/ogg", "audio/opus"))
 
         if needs_wav_conversion:
-            processed_audio_data = convert_to_wav(audio_data_bytes, final_mime_type)
-            processed_audio_mime = "audio/wav"
-        else:
-            processed_audio_data = audio_data_bytes
-            processed_audio_mime = final_mime_type
-    else:
-        logging.warning("MIME type not determined. Assuming raw audio and attempting WAV conversion (defaulting to %s).", DEFAULT_RAW_AUDIO_MIME)
-        processed_audio_data = convert_to_wav(audio_data_bytes, DEFAULT_RAW_AUDIO_MIME)
-        processed_audio_mime = "audio/wav"
+            return postprocessed_wav(audio_data_bytes, final_mime_type), "audio/wav"
+        return audio_data_bytes, final_mime_type
+    logging.warning("MIME type not determined. Assuming raw audio and attempting WAV conversion (defaulting to %s).", DEFAULT_RAW_AUDIO_MIME)
+    return postprocessed_wav(audio_data_bytes, DEFAULT_RAW_AUDIO_MIME), "audio/wav"
 
-    # --- MP3 compression ---
+def _compress(processed_audio_data: bytes, processed_audio_mime: str) -> tuple[bytes, str]:
+    """Compresses processed audio to MP3, the format cached clips are stored in."""
     if processed_audio_data:
         try:
-            # Load audio into AudioSegment
-            audio_segment = AudioSegment.from_file(io.BytesIO(processed_audio_data), format="wav")
-            mp3_buffer = io.BytesIO()
-            audio_segment.export(mp3_buffer, format="mp3")
-            mp3_bytes = mp3_buffer.getvalue()
+            # Encoded on the audio encoder pool, off this thread.
+            with span("tts.mp3_encode", wav_bytes=len(processed_audio_data)):
+                mp3_bytes = encode_audio(processed_audio_data, codec_for_mime_type(processed_audio_mime) or "wav", "mp3")
             return mp3_bytes, "audio/mpeg"
         except Exception as e:
             logging.warning("MP3 compression failed: %s. Falling back to WAV.", e)
@@ -169,44 +223,236 @@ def _synthesize_gemini_tts_impl(text: str, gemini_voice_name: str) -> tuple[byte
         logging.error(error_message)
         raise TTSGenerationError(error_message)
 
-# Always create the memoized function first, so we can access its .key() method
-_memoized_tts_func = cache.memoize()(_synthesize_gemini_tts_impl)
+def _synthesize_gemini_tts_impl(text: str, gemini_voice_name: str) -> tuple[bytes, str]:
+    """
+    Synthesizes English text using the Gemini API via the google-genai library.
+    Returns a tuple: (processed_audio_data_bytes, final_mime_type).
+    Raises TTSGenerationError on failure.
+    """
+    speech_config = {
+        "voice_config": {
+            "prebuilt_voice_config": {
+                "voice_name": gemini_voice_name
+            }
+        }
+    }
+    audio_data_bytes, final_mime_type = _request_speech(text, speech_config, voice=gemini_voice_name)
+    return _compress(*_to_wav(audio_data_bytes, final_mime_type))
+
+def _synthesize_gemini_dialogue_impl(lines: tuple, voices: tuple, instructions: str = "") -> tuple[bytes, str, list]:
+    """
+    Synthesizes a multi-speaker exchange in one request. `lines` is a tuple of (speaker, text)
+    and `voices` a tuple of (speaker, Gemini voice name). Returns (audio, mime_type, segments),
+    where segments[i] = {"speaker", "start_ms", "end_ms"} locates lines[i] in the audio.
+    Raises TTSGenerationError on failure.
+    """
+    speakers = " and ".join(speaker for speaker, _ in voices)
+    contents = (instructions or f"TTS the following conversation between {speakers}:") + "\n" + \
+        "\n".join(f"{speaker}: {text}" for speaker, text in lines)
+    speech_config = {
+        "multi_speaker_voice_config": {
+            "speaker_voice_configs": [
+                {"speaker": speaker, "voice_config": {"prebuilt_voice_config": {"voice_name": voice}}}
+                for speaker, voice in voices
+            ]
+        }
+    }
+    audio_data_bytes, final_mime_type = _request_speech(contents, speech_config, speakers=speakers)
+    processed_audio_data, processed_audio_mime = _to_wav(audio_data_bytes, final_mime_type)
+
+    # The API does not say where each speaker starts; place the turns at the pauses
+    # that best match the length of their text.
+    offsets = [{"start_ms": 0, "end_ms": None} for _ in lines]
+    if processed_audio_mime == "audio/wav":
+        with wave.open(io.BytesIO(processed_audio_data), 'rb') as wav:
+            pcm, rate = wav.readframes(wav.getnframes()), wav.getframerate()
+        offsets = segment_offsets(pcm, rate, [len(text) for _, text in lines])
+    segments = [dict(offset, speaker=speaker) for offset, (speaker, _) in zip(offsets, lines)]
+    audio, mime_type = _compress(processed_audio_data, processed_audio_mime)
+    return audio, mime_type, segments
+
+def _speech_entry_point(memoized_func, no_audio: tuple):
+    """
+    Wraps a memoized synthesis function. With GENERATE_SPEECH, failures are logged and
+    `no_audio` is returned instead; without it the cache is only read, never filled.
+    """
+    if GENERATE_SPEECH:
+        def synthesize_with_error_handling(*args, **kwargs):
+            """
+            A wrapper for the memoized TTS function that catches errors and returns `no_audio`.
+            This makes the audio generation more resilient to individual failures.
+            """
+            try:
+                # Attempt to get the audio from the cache or by generating it.
+                return memoized_func(*args, **kwargs)
+            except TTSGenerationError as e:
+                # If generation fails, log the error and return no audio.
+                logging.error("Handled TTS Generation Error: %s. Continuing without audio for this segment.", e)
+                return no_audio
+
+        return synthesize_with_error_handling
 
-if GENERATE_SPEECH:
-    def synthesize_gemini_tts_with_error_handling(*args, **kwargs) -> tuple[bytes | None, str | None]:
-        """
-        A wrapper for the memoized TTS function that catches errors and returns (None, None).
-        This makes the audio generation more resilient to individual failures.
-        """
-        try:
-            # Attempt to get the audio from the cache or by generating it.
-            return _memoized_tts_func(*args, **kwargs)
-        except TTSGenerationError as e:
-            # If generation fails, log the error and return None, None.
-            logging.error("Handled TTS Generation Error: %s. Continuing without audio for this segment.", e)
-            return None, None
-
-    synthesize_gemini_tts = synthesize_gemini_tts_with_error_handling
-else:
     # When not generating speech, create a read-only function that only
     # checks the cache and does not generate new audio.
-    def read_only_synthesize_gemini_tts(*args, **kwargs):
+    def read_only_synthesize(*args, **kwargs):
         """
         Checks cache for a result, but never calls the underlying TTS function.
         This is a 'read-only' memoization check.
         """
         # Generate the cache key using the memoized function's key method.
-        key = _memoized_tts_func.__cache_key__(*args, **kwargs)
+        key = memoized_func.__cache_key__(*args, **kwargs)
 
         # Check the cache directly using the generated key.
         _sentinel = object()
-        result = cache.get(key, default=_sentinel)
+        result = memo_cache.get(key, default=_sentinel)
 
         if result is not _sentinel:
             return result  # Cache hit
 
         # Cache miss
         logging.info("GENERATE_SPEECH is false and no cached result found for key: %s", key)
+        return no_audio
+
+    return read_only_synthesize
+
+
+# Always create the memoized function first, so we can access its .key() method
+_memoized_tts_func = memo_cache.memoize()(_synthesize_gemini_tts_impl)
+synthesize_gemini_tts = _speech_entry_point(_memoized_tts_func, (None, None))
+_memoized_dialogue_func = memo_cache.memoize()(_synthesize_gemini_dialogue_impl)
+synthesize_gemini_dialogue = _speech_entry_point(_memoized_dialogue_func, (None, None, None))
+
+
+def _prompt_cache_key(prompt: str, voice: str) -> tuple:
+    return _memoized_tts_func.__cache_key__(prompt, voice)
+
+def _cached_line(text: str, voice: str, style_id: str, style_prompt: str):
+    """
+    Returns the cached (audio, mime_type) of a line, found by its canonical key or, for clips
+    cached before canonical keys existed, by the exact styled prompt. None on a miss.
+    """
+    canonical = tts_cache_key(voice, style_id, text)
+    audio_key = memo_cache.get(canonical)
+    if audio_key is not None:
+        result = memo_cache.get(audio_key)
+        if result is not None:
+            return result
+    for prompt in dict.fromkeys((style_prompt + text, style_prompt + canonical[-1])):
+        audio_key = _prompt_cache_key(prompt, voice)
+        result = memo_cache.get(audio_key)
+        if result is not None:
+            if GENERATE_SPEECH:  # A read-only (shipped) cache is never written to.
+                memo_cache.set(canonical, audio_key)
+            return result
+    return None
+
+def _synthesize_line(text: str, voice: str, style_id: str, style_prompt: str) -> tuple[bytes, str]:
+    """Synthesizes a whole line in one request and indexes the clip under its canonical key."""
+    text = normalize_tts_text(text)
+    audio_data, mime_type = synthesize_gemini_tts(style_prompt + text, voice)
+    if audio_data and GENERATE_SPEECH:
+        memo_cache.set(tts_cache_key(voice, style_id, text), _prompt_cache_key(style_prompt + text, voice))
+    return audio_data, mime_type
+
+def _stitch(clips: list) -> tuple[bytes, str]:
+    """
+    Joins clips of the same codec into one, decoded and re-encoded once on the audio encoder
+    pool (plain MP3 concatenation leaves encoder padding between the clips). Returns
+    (None, None) if the clips cannot be joined.
+    """
+    mime_types = {mime_type for _, mime_type in clips}
+    codec = codec_for_mime_type(mime_types.pop()) if len(mime_types) == 1 else None
+    if codec is None:
         return None, None
+    try:
+        return concat_audio([audio for audio, _ in clips], codec), CODEC_MIME_TYPES[codec]
+    except Exception as e:
+        logging.warning("Stitching %d %s clips failed: %s", len(clips), codec, e)
+        return None, None
+
+def _count_phrase(voice: str, style_id: str, sentence: str) -> int:
+    """Counts one more use of a sentence; its count expires TTS_PHRASE_SEEN_TTL after the last use."""
+    key = ("tts_phrase_seen", voice, style_id, sentence)
+    seen = cache.incr(key, default=0, retry=True)
+    cache.touch(key, expire=TTS_PHRASE_SEEN_TTL, retry=True)
+    return seen or 0  # A timed-out incr returns None: treated as not seen.
+
+def _reusable_phrases(sentences: list, voice: str, style_id: str) -> set:
+    """
+    Counts the sentences of a line being synthesized; returns those worth synthesizing on their
+    own. Without GENERATE_SPEECH nothing is counted and only sentences already cached on their
+    own are reused.
+    """
+    phrases = set()
+    for sentence in sentences:
+        if len(sentence) < TTS_PHRASE_MIN_CHARS:
+            continue
+        seen = _count_phrase(voice, style_id, sentence) if GENERATE_SPEECH else 0
+        if seen >= TTS_PHRASE_MIN_REPEATS or memo_cache.get(tts_cache_key(voice, style_id, sentence)) is not None:
+            phrases.add(sentence)
+    return phrases
+
+def synthesize_styled_tts(text: str, voice: str, style_id: str, style_prompt: str) -> tuple[bytes, str]:
+    """
+    Synthesizes `text` spoken in `voice` with a style prompt (e.g. "Speak in a brisk manner: "),
+    cached under the canonical key (voice, style_id, normalized text). On a miss, recurring
+    sentences are reused from their own cached clips and stitched together with the rest of
+    the line. Returns (audio, mime_type), or (None, None) without audio.
+    """
+    cached = _cached_line(text, voice, style_id, style_prompt)
+    if cached is not None:
+        return cached
+    text = normalize_tts_text(text)
+    sentences = [sentence for sentence in re.split(r'(?<=[.!?])\s+', text) if sentence]
+    phrases = _reusable_phrases(sentences, voice, style_id) if TTS_PHRASE_REUSE and len(sentences) > 1 else set()
+    if not phrases:
+        return _synthesize_line(text, voice, style_id, style_prompt)
+
+    # Phrases are synthesized on their own; the sentences between them in one request per run.
+    parts, run = [], []
+    for sentence in sentences:
+        if sentence in phrases:
+            parts += [" ".join(run), sentence] if run else [sentence]
+            run = []
+        else:
+            run.append(sentence)
+    if run:
+        parts.append(" ".join(run))
+    with span("tts.stitch", parts=len(parts), phrases=len(phrases)):
+        clips = [_cached_line(part, voice, style_id, style_prompt) or _synthesize_line(part, voice, style_id, style_prompt)
+                 for part in parts]
+        audio_data, mime_type = _stitch(clips) if all(audio for audio, _ in clips) else (None, None)
+    if not audio_data:
+        return _synthesize_line(text, voice, style_id, style_prompt)
+    if GENERATE_SPEECH:
+        stitched_key = ("tts_stitched",) + tts_cache_key(voice, style_id, text)[1:]
+        memo_cache.set(stitched_key, (audio_data, mime_type))
+        memo_cache.set(tts_cache_key(voice, style_id, text), stitched_key)
+    return audio_data, mime_type
+
 
-    synthesize_gemini_tts = read_only_synthesize_gemini_tts
\ No newline at end of file
+def transcode_audio(audio_data: bytes, mime_type: str, codec: str = None, bitrate_kbps: int = None) -> tuple[bytes, str]:
+    """
+    Returns a synthesized clip in `codec` (a key of audio_encoder.CODEC_MIME_TYPES; None
+    keeps the clip's codec), as a mono `bitrate_kbps` variant if given. Cached TTS audio
+    is the master copy; every other codec/bitrate variant is derived from it on first
+    request and cached on its own under the clip's digest. Falls back to the master if
+    transcoding fails.
+    """
+    source_codec = codec_for_mime_type(mime_type)
+    codec = codec or source_codec
+    if codec == "wav":
+        bitrate_kbps = None  # Uncompressed; there is no lower-bitrate variant.
+    if not audio_data or source_codec is None or (source_codec == codec and not bitrate_kbps):
+        return audio_data, mime_type
+    key = ("transcode", hashlib.sha1(audio_data).hexdigest(), codec, bitrate_kbps)
+    transcoded = memo_cache.get(key)
+    if transcoded is None:
+        try:
+            with span("tts.transcode", codec=codec, bitrate_kbps=bitrate_kbps, source_bytes=len(audio_data)):
+                transcoded = encode_audio(audio_data, source_codec, codec, bitrate_kbps)
+        except Exception as e:
+            logging.warning("Transcoding audio to %s (%s kbps) failed: %s. Sending the master.", codec, bitrate_kbps, e)
+            return audio_data, mime_type
+        memo_cache.set(key, transcoded)
+    return transcoded, CODEC_MIME_TYPES[codec]
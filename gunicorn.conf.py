@@ -0,0 +1,23 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Gunicorn hooks for app.py (see the Dockerfile)."""
+
+
+def post_worker_init(worker):
+    # Background work starts here rather than when app.py is imported, so helper
+    # processes that re-import the main module (the audio encoder pool) stay idle.
+    from warmup import get_warmup_job, WARMUP_ON_STARTUP
+    if WARMUP_ON_STARTUP:
+        get_warmup_job().start()
@@ -0,0 +1,308 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Bounded scheduler for interview simulations.
+
+Simulations run on a fixed pool of worker threads fed by a bounded queue, with a
+per-user limit on concurrent interviews. Requests only read events from the
+job they are attached to, so the number of open streams is no longer tied to
+the number of simulations that can run at once. Under gunicorn's gevent worker
+(see Dockerfile) the waits below are cooperative, so an open stream holds a
+greenlet rather than an OS thread.
+"""
+
+import collections
+import logging
+import os
+import threading
+import time
+
+import broadcaster
+import interview_store
+from broadcaster import InterviewChannel
+from cancellation import CancelToken, InterviewCancelled
+from interview_simulator import PCP_PROFILE, stream_interview_events
+from quality_governor import get_quality_governor
+
+INTERVIEW_WORKERS = int(os.environ.get("INTERVIEW_WORKERS", 4))
+INTERVIEW_QUEUE_SIZE = int(os.environ.get("INTERVIEW_QUEUE_SIZE", 16))
+INTERVIEW_MAX_PER_USER = int(os.environ.get("INTERVIEW_MAX_PER_USER", 2))
+# Seconds a job keeps running with no attached client, so that an EventSource
+# reconnect can pick it up again before its work is abandoned.
+INTERVIEW_DISCONNECT_GRACE = float(os.environ.get("INTERVIEW_DISCONNECT_GRACE", 10))
+# Seconds between SSE keep-alives; a write to a closed connection is how a
+# client disconnect is detected, so this bounds the detection delay.
+STREAM_HEARTBEAT_INTERVAL = float(os.environ.get("STREAM_HEARTBEAT_INTERVAL", 5))
+
+
+class SchedulerSaturatedError(Exception):
+    """Raised when an interview cannot be admitted. `reason` is "queue_full" or "user_limit"."""
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class InterviewJob:
+    """A single scheduled interview; its events are fanned out through an InterviewChannel."""
+
+    def __init__(self, interview_id, patient_name, condition_name, user_id, last_event_id=0, options=None,
+                 profile=PCP_PROFILE):
+        self.interview_id = interview_id
+        self.patient_name = patient_name
+        self.condition_name = condition_name
+        self.user_id = user_id
+        self.options = options or {}
+        self.profile = profile
+        self.start_seq = last_event_id
+        self.status = "queued"  # queued -> running -> done | failed | cancelled
+        self.channel = InterviewChannel(interview_id, last_event_id)
+        self.cancel_token = CancelToken()
+        self._subscribers = 0
+        self._cond = threading.Condition()
+
+    def publish(self, seq: int, message: str):
+        self.channel.publish(seq, message)
+
+    def set_status(self, status: str, error: Exception = None):
+        with self._cond:
+            self.status = status
+            self._cond.notify_all()
+        if status in ("done", "failed", "cancelled"):
+            self.channel.close(error)
+
+    def attach(self):
+        with self._cond:
+            self._subscribers += 1
+
+    def detach(self):
+        """Drops a subscriber; the job is cancelled if nobody re-attaches within the grace period."""
+        with self._cond:
+            self._subscribers -= 1
+            if self._subscribers > 0:
+                return
+        timer = threading.Timer(INTERVIEW_DISCONNECT_GRACE, self._cancel_if_abandoned)
+        timer.daemon = True
+        timer.start()
+
+    def _cancel_if_abandoned(self):
+        with self._cond:
+            if self._subscribers > 0 or self.status not in ("queued", "running"):
+                return
+        if broadcaster.has_remote_viewers(self.interview_id):
+            # Viewers in other workers are still following the interview.
+            timer = threading.Timer(INTERVIEW_DISCONNECT_GRACE, self._cancel_if_abandoned)
+            timer.daemon = True
+            timer.start()
+            return
+        logging.info("No client attached to interview %s; cancelling it.", self.interview_id)
+        self.cancel_token.cancel("client disconnected")
+
+    def subscribe(self, scheduler, after_seq: int = 0, poll_interval: float = 1.0):
+        """
+        Yields ("queued", position) while the job waits for a worker, then
+        ("event", (seq, message)) for every event with seq > after_seq, and
+        ("heartbeat", None) whenever nothing was sent for STREAM_HEARTBEAT_INTERVAL.
+        Raises the job's error if the simulation failed.
+        The caller counts as attached until the generator is closed.
+        """
+        self.attach()
+        try:
+            yield from self._subscribe(scheduler, after_seq, poll_interval)
+        finally:
+            self.detach()
+
+    def _subscribe(self, scheduler, after_seq, poll_interval):
+        last_position = None
+        last_sent = time.monotonic()
+        while True:
+            with self._cond:
+                if self.status == "queued":
+                    self._cond.wait(poll_interval)
+                queued = self.status == "queued"
+            if not queued:
+                break
+            position = scheduler.queue_position(self)
+            if position != last_position:
+                last_position = position
+                last_sent = time.monotonic()
+                yield "queued", position
+            elif time.monotonic() - last_sent >= STREAM_HEARTBEAT_INTERVAL:
+                last_sent = time.monotonic()
+                yield "heartbeat", None
+
+        yield from _relay(self.channel.subscribe(after_seq, poll_interval))
+
+
+class RemoteInterviewView:
+    """Read-only view of an interview that runs in another worker (or has finished)."""
+
+    def __init__(self, interview_id):
+        self.interview_id = interview_id
+
+    def subscribe(self, scheduler, after_seq: int = 0, poll_interval: float = 1.0):
+        yield from _relay(broadcaster.tail_store(self.interview_id, after_seq, poll_interval))
+
+
+def _relay(events):
+    """Turns channel events into subscribe() items, with keep-alives while idle."""
+    last_sent = time.monotonic()
+    for event in events:
+        if event is not None:
+            last_sent = time.monotonic()
+            yield "event", event
+        elif time.monotonic() - last_sent >= STREAM_HEARTBEAT_INTERVAL:
+            last_sent = time.monotonic()
+            yield "heartbeat", None
+
+
+class InterviewScheduler:
+    """Runs interview jobs on a bounded worker pool with admission control."""
+
+    def __init__(self, max_workers=INTERVIEW_WORKERS, max_queue=INTERVIEW_QUEUE_SIZE,
+                 max_per_user=INTERVIEW_MAX_PER_USER):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self._lock = threading.Condition()
+        self._queue = collections.deque()
+        self._jobs = {}  # interview_id -> queued or running job
+        self._running = 0
+        self._workers = []
+
+    def _ensure_workers(self):
+        # Workers are started lazily so they are created in the serving process
+        # (and not in a gunicorn master that forks afterwards).
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, name=f"interview-worker-{len(self._workers)}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, interview_id, patient_name, condition_name, user_id, last_event_id=0,
+               options=None, profile=PCP_PROFILE) -> InterviewJob:
+        """
+        Returns the active job for `interview_id`, scheduling a new one if there is none.
+        `profile` selects the kind of interview (see interview_simulator.InterviewProfile).
+        Raises SchedulerSaturatedError if the user or the queue is at its limit.
+        """
+        with self._lock:
+            job = self._jobs.get(interview_id)
+            if job and not job.cancel_token.is_cancelled:
+                return job
+            if broadcaster.is_live_elsewhere(interview_id):
+                # Another worker runs this interview; follow its event log instead.
+                return RemoteInterviewView(interview_id)
+
+            user_jobs = sum(1 for j in self._jobs.values()
+                            if j.user_id == user_id and not j.cancel_token.is_cancelled)
+            if user_jobs >= self.max_per_user:
+                raise SchedulerSaturatedError(
+                    f"Too many concurrent interviews for this user (limit {self.max_per_user}).", "user_limit")
+            # Jobs that an idle worker is about to pick up do not count as waiting.
+            idle_workers = self.max_workers - self._running
+            if len(self._queue) >= idle_workers + self.max_queue:
+                raise SchedulerSaturatedError(
+                    "All interview slots are busy and the waiting queue is full. Please try again shortly.", "queue_full")
+
+            job = InterviewJob(interview_id, patient_name, condition_name, user_id, last_event_id, options, profile)
+            self._jobs[interview_id] = job
+            self._queue.append(job)
+            self._ensure_workers()
+            self._lock.notify()
+            return job
+
+    def watch(self, interview_id):
+        """
+        Returns a view of an existing interview without ever starting work for it,
+        or None if the interview is unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(interview_id)
+            if job and not job.cancel_token.is_cancelled:
+                return job
+        if broadcaster.is_live_elsewhere(interview_id) or interview_store.load_checkpoint(interview_id):
+            return RemoteInterviewView(interview_id)
+        return None
+
+    def queue_position(self, job: InterviewJob) -> int:
+        """1-based position of a queued job, or 0 once it is running."""
+        with self._lock:
+            try:
+                return self._queue.index(job) + 1
+            except ValueError:
+                return 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "running": self._running,
+                "queued": len(self._queue),
+                "max_queue": self.max_queue,
+                "max_per_user": self.max_per_user
+            }
+
+    def _worker_loop(self):
+        while True:
+            with self._lock:
+                while not self._queue:
+                    self._lock.wait()
+                job = self._queue.popleft()
+                if job.cancel_token.is_cancelled:
+                    # Abandoned while still waiting for a worker.
+                    self._forget(job)
+                    job.set_status("cancelled")
+                    continue
+                self._running += 1
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._forget(job)
+
+    def _forget(self, job: InterviewJob):
+        # A cancelled job may already have been replaced by a resumed one.
+        if self._jobs.get(job.interview_id) is job:
+            del self._jobs[job.interview_id]
+
+    def _run(self, job: InterviewJob):
+        job.set_status("running")
+        # The quality level is chosen when the interview starts; a resumed interview
+        # keeps the options (and level) stored in its checkpoint.
+        job.options = get_quality_governor().apply(job.options, self.stats())
+        try:
+            for seq, message in stream_interview_events(job.patient_name, job.condition_name,
+                                                        job.interview_id, job.start_seq, job.cancel_token,
+                                                        job.options, job.profile):
+                job.publish(seq, message)
+        except InterviewCancelled:
+            logging.info("Interview %s cancelled; worker released.", job.interview_id)
+            job.set_status("cancelled")
+        except Exception as e:
+            logging.error("Interview %s failed: %s", job.interview_id, e, exc_info=True)
+            job.set_status("failed", e)
+        else:
+            job.set_status("done")
+
+
+# Singleton instance
+_interview_scheduler = None
+
+def get_interview_scheduler():
+    """Get or create the interview scheduler instance"""
+    global _interview_scheduler
+    if _interview_scheduler is None:
+        _interview_scheduler = InterviewScheduler()
+    return _interview_scheduler
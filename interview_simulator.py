@@ -16,12 +16,45 @@ import json
 import re
 import os
 import base64
+import time
 
 from gemini import gemini_get_text_response
 from medgemma import medgemma_get_text_response
-from gemini_tts import synthesize_gemini_tts
+from gemini_tts import synthesize_styled_tts, synthesize_gemini_dialogue, split_into_chunks, transcode_audio
+import interview_store
+from cancellation import run_cancellable, submit_call, wait_for, Deadline, DeadlineExceeded
+from cache import memo_cache
+from convergence import ConvergenceDetector, CONVERGENCE_PATIENCE
+from neuro_interview import get_neuro_patient
+from fhir_digest import build_fhir_digest
+from optional_symptoms import resolve_symptoms, OPTIONAL_SYMPTOM_SEED
+from quality_governor import get_quality_governor
+from tracing import span
+from degradation import (TURN_DEADLINE_SECONDS, CANNED_INTERVIEWER_QUESTION, CANNED_PATIENT_ANSWER,
+                         MAX_UNCOUNTED_CANNED_ANSWERS, get_degradation_stats)
 
 INTERVIEWER_VOICE = "Aoede"
+# Whether to summarize the interviewer's first "thinking" block (an extra Gemini call).
+THINKING_SUMMARY = os.environ.get("INTERVIEW_THINKING_SUMMARY", "true").lower() == "true"
+# Fixed interviewer lines. The closing line is also spoken when an interview is ended early because it converged.
+INTERVIEW_OPENING_LINE = "Thank you for booking an appointment with your primary doctor. I am an assistant here to ask a few questions to help your doctor prepare for your visit. To start, what is your main concern today?"
+INTERVIEW_CLOSING_LINE = "Thank you for answering my questions. I have everything needed to prepare a report for your visit."
+# Style instructions prepended to the text sent to TTS.
+INTERVIEWER_TTS_STYLE = "Speak in a slightly upbeat and brisk manner, as a friendly clinician: "
+PATIENT_TTS_STYLE = "Say this in faster speed, using a sick tone: "
+# Style prompts by style id; cached audio is keyed by the id, not by the prompt's wording.
+TTS_STYLES = {"interviewer": INTERVIEWER_TTS_STYLE, "patient": PATIENT_TTS_STYLE}
+# Style instructions for a whole question/answer exchange synthesized in one multi-speaker request.
+EXCHANGE_TTS_INSTRUCTIONS = ("TTS the following conversation between Interviewer and Patient. Interviewer speaks in a "
+                             "slightly upbeat and brisk manner, as a friendly clinician; Patient speaks faster, using a sick tone:")
+# How EHR summaries are built: "fhir" (MedGemma on the raw FHIR JSON, matches the shipped cache),
+# "digest" (MedGemma on the local FHIR digest) or "local" (the digest itself, no LLM call).
+EHR_SUMMARY_SOURCE = os.environ.get("EHR_SUMMARY_SOURCE", "fhir").lower()
+# Synthesize long lines sentence by sentence and stream the audio chunks as they are ready.
+# Off by default: chunk prompts do not match the whole-line audio in the shipped cache.
+TTS_CHUNKED = os.environ.get("TTS_CHUNKED", "false").lower() == "true"
+# Chunks of one line synthesized at the same time.
+TTS_CHUNK_PARALLELISM = int(os.environ.get("TTS_CHUNK_PARALLELISM", 3))
 
 def read_symptoms_json():
     # Load the list of symptoms for each condition from a JSON file
@@ -42,13 +75,16 @@ def read_fhir_json(patient):
     with open(os.path.join(os.environ.get("FRONTEND_BUILD", "frontend/build"), patient["fhirFile"].lstrip("/")), 'r') as f:
         return json.load(f)
 
-def get_ehr_summary_per_patient(patient_name):
-    # Returns a concise EHR summary for the patient, using LLM if not already cached
-    patient = get_patient(patient_name)
-    if patient.get("ehr_summary"):
-        return patient["ehr_summary"]
-    # Use MedGemma to summarize the EHR for the patient
-    ehr_summary = medgemma_get_text_response([
+def summarize_fhir_record(patient_name, fhir_record):
+    """
+    Returns the EHR summary used in the interviewer and report prompts, according to EHR_SUMMARY_SOURCE:
+    "fhir" summarizes the raw FHIR JSON with MedGemma, "digest" summarizes the local digest
+    (a much smaller call), and "local" uses the digest as-is without any LLM call.
+    """
+    if EHR_SUMMARY_SOURCE == "local":
+        return build_fhir_digest(fhir_record)
+    ehr_text = build_fhir_digest(fhir_record) if EHR_SUMMARY_SOURCE == "digest" else json.dumps(fhir_record)
+    return medgemma_get_text_response([
         {
             "role": "system",
             "content": [
@@ -65,27 +101,56 @@ def get_ehr_summary_per_patient(patient_name):
             "content": [
                 {
                     "type": "text",
-                    "text": json.dumps(read_fhir_json(patient))
+                    "text": ehr_text
                 }
             ]
         }
     ])
+
+def get_ehr_summary_per_patient(patient_name):
+    # Returns a concise EHR summary for the patient, using LLM if not already cached
+    patient = get_patient(patient_name)
+    if patient.get("ehr_summary"):
+        return patient["ehr_summary"]
+    ehr_summary = summarize_fhir_record(patient_name, read_fhir_json(patient))
     patient["ehr_summary"] = ehr_summary
     return ehr_summary
 
+def get_neuro_ehr_summary(patient_name):
+    # Same as get_ehr_summary_per_patient for a neurological patient; most of them have no FHIR file yet
+    patient = get_neuro_patient(patient_name)
+    if patient.get("ehr_summary") is not None:
+        return patient["ehr_summary"]
+    try:
+        fhir_record = read_fhir_json(patient)
+    except FileNotFoundError:
+        fhir_record = None
+    patient["ehr_summary"] = summarize_fhir_record(patient_name, fhir_record) if fhir_record else ""
+    return patient["ehr_summary"]
+
 PATIENTS = read_patient_and_conditions_json()["patients"]
 SYMPTOMS = read_symptoms_json()
+OPTIONAL_SYMPTOMS_RULE = """- **Handle Optional Symptoms:** Your symptom list may contain optional symptoms (e.g., "I might have..."). Before the interview starts, you MUST silently decide 'yes' or 'no' for each optional symptom. A 50% chance for each is a good approach. Remember your choices and be consistent throughout the entire interview.
+        """
    
-def patient_roleplay_instructions(patient_name, condition_name, previous_answers):
+def patient_roleplay_instructions(patient_name, condition_name, previous_answers, symptoms=None):
     """
     Generates structured instructions for the LLM to roleplay as a patient, including persona, scenario, and symptom logic.
+    `symptoms` is the session's resolved symptom list (see optional_symptoms); without it
+    the LLM is told to decide the optional symptoms itself.
     """
     # This assumes SYMPTOMS is a globally available dictionary as in the user's example
     patient = get_patient(patient_name)
-    symptoms = "\n".join(SYMPTOMS[condition_name])
+    if symptoms is None:
+        preamble = "Before the interview begins, silently review the optional symptoms and decide which ones you have."
+        optional_rule = OPTIONAL_SYMPTOMS_RULE
+        symptoms = SYMPTOMS[condition_name]
+    else:
+        preamble, optional_rule = "You are roleplaying as the patient described below.", ""
+    symptoms = "\n".join(symptoms)
 
     return f"""
-        SYSTEM INSTRUCTION: Before the interview begins, silently review the optional symptoms and decide which ones you have.
+        SYSTEM INSTRUCTION: {preamble}
 
         ### Your Persona ###
         - **Name:** {patient_name}
@@ -106,8 +171,7 @@ def patient_roleplay_instructions(patient_name, condition_name, previous_answers
         ---
 
         ### Critical Rules of Roleplay ###
-        - **Handle Optional Symptoms:** Your symptom list may contain optional symptoms (e.g., "I might have..."). Before the interview starts, you MUST silently decide 'yes' or 'no' for each optional symptom. A 50% chance for each is a good approach. Remember your choices and be consistent throughout the entire interview.
-        - **Act as the Patient:** Your entire response must be ONLY what the patient would say. Do not add external comments, notes, or clarifications (e.g., do not write "[I am now describing the headache]").
+        {optional_rule}- **Act as the Patient:** Your entire response must be ONLY what the patient would say. Do not add external comments, notes, or clarifications (e.g., do not write "[I am now describing the headache]").
         - **No Guessing:** You DO NOT know your diagnosis or the name of your condition. Do not guess or speculate about it.
         - **Answer Only What Is Asked:** Do not volunteer your entire list of symptoms at once. Respond naturally to the specific question asked by the interviewer.
 
@@ -148,9 +212,9 @@ def interviewer_roleplay_instructions(patient_name):
         EHR RECORD END
 
         ### Procedure ###
-        1.  **Start Interview:** Begin the conversation with this exact opening: "Thank you for booking an appointment with your primary doctor. I am an assistant here to ask a few questions to help your doctor prepare for your visit. To start, what is your main concern today?"
+        1.  **Start Interview:** Begin the conversation with this exact opening: "{INTERVIEW_OPENING_LINE}"
         2.  **Conduct Interview:** Proceed with your questioning, following all rules and strategies above.
-        3.  **End Interview:** You MUST continue the interview until you have asked 20 questions OR the patient is unable to provide more information. When the interview is complete, you MUST conclude by printing this exact phrase: "Thank you for answering my questions. I have everything needed to prepare a report for your visit. End interview."
+        3.  **End Interview:** You MUST continue the interview until you have asked 20 questions OR the patient is unable to provide more information. When the interview is complete, you MUST conclude by printing this exact phrase: "{INTERVIEW_CLOSING_LINE} End interview."
     """
 
 def report_writer_instructions(patient_name: str) -> str:
@@ -215,6 +279,10 @@ def write_report(patient_name: str, interview_text: str, existing_report: str =
         with open("report_template.txt", 'r') as f:
             existing_report = f.read()
 
+    return update_report(instructions, interview_text, existing_report)
+
+def update_report(instructions: str, interview_text: str, existing_report: str) -> str:
+    """Asks MedGemma to fold the new interview text into `existing_report`, following the system `instructions`."""
     # Construct the user prompt with the specific task and data
     user_prompt = f"""<interview_start>
 {interview_text}
@@ -261,77 +329,358 @@ Now, generate the complete and updated medical report based on all system and us
 
 
 
-def stream_interview(patient_name, condition_name):
-    print(f"Starting interview simulation for patient: {patient_name}, condition: {condition_name}")
+def synthesize_audio_data_url(text, voice, style, cancel=None, codec=None, bitrate=None):
+    """
+    Synthesizes `text` in the TTS style `style` (a key of TTS_STYLES); returns a base64 data URL,
+    or None without audio. With `codec` ("mp3", "ogg" or "wav") and/or `bitrate` (kbps) the
+    client gets a variant derived from the cached master clip.
+    """
+    audio_data, mime_type = run_cancellable(synthesize_styled_tts, text, voice, style, TTS_STYLES[style], cancel=cancel)
+    if audio_data and mime_type and (codec or bitrate):
+        audio_data, mime_type = transcode_audio(audio_data, mime_type, codec, bitrate)
+    if audio_data and mime_type:
+        return f"data:{mime_type};base64,{base64.b64encode(audio_data).decode('utf-8')}"
+    return None
+
+
+def adapt_audio_data_url(data_url, codec=None, bitrate=None):
+    """
+    Returns the audio of an already sent event (a data URL) in `codec` and/or as a `bitrate`
+    variant, e.g. for a viewer whose player differs from the interview owner's. Variants are
+    cached per clip, so the cost depends on the number of distinct formats, not of viewers.
+    """
+    header, _, encoded = (data_url or "").partition(";base64,")
+    if not (codec or bitrate) or not header.startswith("data:") or not encoded:
+        return data_url
+    audio_data, mime_type = transcode_audio(base64.b64decode(encoded), header[len("data:"):], codec, bitrate)
+    return f"data:{mime_type};base64,{base64.b64encode(audio_data).decode('utf-8')}"
+
+
+def synthesize_exchange_audio(question, answer, patient_voice, codec=None, bitrate=None):
+    """
+    Synthesizes a whole question/answer exchange in one multi-speaker TTS request, for replay
+    and export (live turns keep one request per line, so the question can play early).
+    Returns {"audio": data URL or None, "segments": [{"speaker", "start_ms", "end_ms"}, ...]}.
+    """
+    lines = (("Interviewer", question), ("Patient", answer))
+    voices = (("Interviewer", INTERVIEWER_VOICE), ("Patient", patient_voice))
+    audio_data, mime_type, segments = synthesize_gemini_dialogue(lines, voices, EXCHANGE_TTS_INSTRUCTIONS)
+    if audio_data and mime_type and (codec or bitrate):
+        audio_data, mime_type = transcode_audio(audio_data, mime_type, codec, bitrate)
+    if not (audio_data and mime_type):
+        return {"audio": None, "segments": []}
+    return {
+        "audio": f"data:{mime_type};base64,{base64.b64encode(audio_data).decode('utf-8')}",
+        "segments": segments
+    }
+
+
+def interview_exchanges(interview_id):
+    """Returns the (question, answer) pairs of a stored interview, in turn order."""
+    checkpoint = interview_store.load_checkpoint(interview_id)
+    if not checkpoint:
+        return []
+    exchanges, question = [], None
+    for _, message in interview_store.load_events(interview_id, 0, checkpoint["seq"]):
+        payload = json.loads(message)
+        if payload.get("speaker") == "interviewer":
+            question = payload["text"]
+        elif payload.get("speaker") == "patient" and question is not None:
+            if not payload.get("degraded"):  # A canned answer is not part of the interview.
+                exchanges.append((question, payload["text"]))
+            question = None
+    return exchanges
+
+
+class InterviewProfile:
+    """The patients, prompts and voices of one kind of simulated interview."""
+
+    def __init__(self, name, get_patient, symptoms, interviewer_instructions, patient_instructions,
+                 write_report, closing_line, patient_voice, answer_events=None, opening_line=None,
+                 interviewer_voice=INTERVIEWER_VOICE):
+        self.name = name
+        self.get_patient = get_patient
+        self.symptoms = symptoms  # {condition name: [symptom lines]}
+        self.interviewer_instructions = interviewer_instructions  # (patient_name) -> str
+        self.patient_instructions = patient_instructions  # (patient_name, condition_name, previous_answers, symptoms) -> str
+        self.write_report = write_report  # (patient_name, interview_text, existing_report) -> str
+        self.closing_line = closing_line
+        self.opening_line = opening_line  # Spoken verbatim as the start of the first question, if any.
+        self.interviewer_voice = interviewer_voice
+        self.patient_voice = patient_voice  # (patient_name) -> TTS voice name
+        # Optional (state, answer_text) -> [event payloads], emitted right after each patient answer.
+        self.answer_events = answer_events
+
+    def fixed_lines(self):
+        """The lines the interviewer always speaks verbatim, e.g. for pre-rendering their audio."""
+        return [line for line in (self.opening_line, self.closing_line) if line]
+
+
+PCP_PROFILE = InterviewProfile(
+    name="pcp",
+    get_patient=get_patient,
+    symptoms=SYMPTOMS,
+    interviewer_instructions=interviewer_roleplay_instructions,
+    patient_instructions=patient_roleplay_instructions,
+    write_report=write_report,
+    closing_line=INTERVIEW_CLOSING_LINE,
+    patient_voice=lambda patient_name: get_patient(patient_name)["voice"],
+    opening_line=INTERVIEW_OPENING_LINE
+)
+
+
+# Stages whose latency tells the quality governor how loaded the LLM backends are.
+_LLM_STAGES = ("interviewer", "patient", "report")
+
+
+def _record_timing(state, stage, duration):
+    state.setdefault("timings", {}).setdefault(stage, []).append(round(duration, 3))
+    if stage in _LLM_STAGES:
+        get_quality_governor().record_latency(duration)
+
+
+def _timed_call(state, stage, fn, *args, cancel=None, deadline=None, **kwargs):
+    """run_cancellable, recording the call duration under state["timings"][stage] and as a trace span."""
+    start = time.perf_counter()
+    try:
+        with span(stage, trace_id=state.get("trace_id"), turn=state.get("turn")):
+            return run_cancellable(fn, *args, cancel=cancel, deadline=deadline, **kwargs)
+    finally:
+        _record_timing(state, stage, time.perf_counter() - start)
+
+
+def _chunked_audio(state, style, text, voice, cancel=None, deadline=None, parallelism=TTS_CHUNK_PARALLELISM,
+                   codec=None, bitrate=None):
+    """
+    Synthesizes `text` sentence chunk by sentence chunk (each chunk cached on its own),
+    at most `parallelism` at a time, and yields the data URLs in order as they are ready.
+    The wait for the first chunk is recorded as "tts_first_audio", the whole line as "tts".
+    """
+    trace_id, turn = state.get("trace_id"), state.get("turn")
+
+    def synthesize_chunk(index, chunk):
+        with span("tts_chunk", trace_id=trace_id, turn=turn, index=index, chars=len(chunk)):
+            return synthesize_audio_data_url(chunk, voice, style, codec=codec, bitrate=bitrate)
+
+    chunks = split_into_chunks(text)
+    start = time.perf_counter()
+    futures = {}
+    try:
+        for index in range(len(chunks)):
+            # Keep a window of `parallelism` chunks in flight ahead of the one being waited for.
+            for ahead in range(index, min(index + parallelism, len(chunks))):
+                if ahead not in futures:
+                    futures[ahead] = submit_call(synthesize_chunk, ahead, chunks[ahead])
+            audio = wait_for(futures.pop(index), cancel, deadline)
+            if index == 0:
+                _record_timing(state, "tts_first_audio", time.perf_counter() - start)
+            yield audio
+    finally:
+        _record_timing(state, "tts", time.perf_counter() - start)
+
+
+def _cached_response(fn, *args, **kwargs):
+    """Returns the memoized result of fn(*args, **kwargs) if it is already cached, else None."""
+    try:
+        return memo_cache.get(fn.__cache_key__(*args, **kwargs))
+    except AttributeError:
+        return None  # Not a memoized function.
+
+
+_CHECKPOINT = object()  # Yielded by _interview_turns once the state is safe to checkpoint.
+
+
+def _initial_interview_state(patient_name, profile=PCP_PROFILE):
+    """Builds the interview state a fresh interview starts from."""
     # Prepare roleplay instructions and initial dialog (using existing helper functions)
-    interviewer_instructions = interviewer_roleplay_instructions(patient_name)
-    
+    interviewer_instructions = profile.interviewer_instructions(patient_name)
+    return {
+        "turn": 0,
+        "dialog": [
+            {
+                "role": "system",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": interviewer_instructions
+                    }
+                ]
+            },
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "start interview"
+                    }
+                ]
+            }
+        ],
+        "full_interview_q_a": "",
+        "report": "",
+        "done": False
+    }
+
+
+def _interview_turns(patient_name, condition_name, state, cancel=None, options=None, profile=PCP_PROFILE):
+    """
+    Runs the interview from the turn recorded in `state`, yielding event payloads.
+    `state` is updated in place and _CHECKPOINT is yielded after every completed turn.
+    Upstream calls are abandoned (InterviewCancelled is raised) once `cancel` is set.
+    With options["convergence_patience"] > 0 the interview is closed early once that
+    many consecutive turns added nothing new to the findings or the report.
+    options["thinking_summary"] = False skips the summary of the first thinking block.
+    With options["symptom_seed"] (or OPTIONAL_SYMPTOM_SEED) the optional symptoms are decided
+    once, stored in `state`, and the patient prompt lists only the resolved symptoms.
+    options["tts"] = False skips speech synthesis (events carry "audio": None).
+    options["max_turns"] caps the number of questions (30 by default) and with
+    options["report_every"] = n the report is rewritten after every n-th answer only.
+    options["quality"] (set by the quality governor) is announced in a "quality" event.
+    With options["tts_chunks"] (TTS_CHUNKED by default) lines are synthesized per sentence
+    chunk: the line's event carries the first chunk and the rest follow in "audio_chunk" events.
+    options["audio_codec"] ("mp3", "ogg" or "wav") transcodes the audio for the client and
+    options["audio_bitrate"] (kbps) sends it a lower-bitrate mono variant.
+    options["turn_deadline"] (TURN_DEADLINE_SECONDS by default, 0 for none) bounds the
+    upstream calls of each turn; calls that run late are replaced by degraded responses,
+    announced in "degraded" events (see degradation.py). The opening question is always
+    waited for, and a turn that ends with a canned answer is asked again without using up
+    one of the max_turns (up to MAX_UNCOUNTED_CANNED_ANSWERS times per interview).
+    The duration of every upstream call is recorded per stage in state["timings"].
+    """
+    options = options or {}
+    symptom_seed = options.get("symptom_seed", OPTIONAL_SYMPTOM_SEED)
+    if symptom_seed and "symptoms" not in state:
+        state["symptoms"] = resolve_symptoms(profile.symptoms[condition_name], symptom_seed)
     # Determine voices for TTS
-    patient = get_patient(patient_name)
-    patient_voice = patient["voice"]
-    
-    dialog = [
-        {
-            "role": "system",
-            "content": [
-                {
+    patient_voice = profile.patient_voice(patient_name)
+    tts = options.get("tts", True)
+    tts_chunks = options.get("tts_chunks", TTS_CHUNKED)
+    audio_codec = options.get("audio_codec")
+    audio_bitrate = options.get("audio_bitrate")
+    turn_deadline = options.get("turn_deadline", TURN_DEADLINE_SECONDS)
+    deadline = None
+    degraded = []  # "degraded" events of the current turn, sent ahead of the event they affect
+
+    def degrade(stage, action):
+        get_degradation_stats().record(stage, action)
+        counts = state.setdefault("degradations", {})
+        counts[action] = counts.get(action, 0) + 1
+        degraded.append({"event": "degraded", "turn": state["turn"], "stage": stage, "action": action})
+
+    def flush_degraded():
+        events = list(degraded)
+        degraded.clear()
+        return events
+
+    def speak(text, style, voice):
+        if not tts:
+            return None
+        try:
+            return _timed_call(state, "tts", synthesize_audio_data_url, text, voice, style, cancel=cancel, deadline=deadline,
+                               codec=audio_codec, bitrate=audio_bitrate)
+        except DeadlineExceeded:
+            degrade("tts", "audio_skipped")
+            return None
+
+    def speak_line(speaker, text, style, voice, **extra):
+        """Yields the event of one spoken line, followed by its remaining audio chunks in chunked mode."""
+        if not (tts and tts_chunks):
+            audio_b64 = speak(text, style, voice)
+            yield from flush_degraded()
+            yield dict({"speaker": speaker, "text": text, "audio": audio_b64}, **extra)
+            return
+        chunks = _chunked_audio(state, style, text, voice, cancel, deadline, codec=audio_codec, bitrate=audio_bitrate)
+        line_sent = False
+        try:
+            first = next(chunks, None)
+            yield from flush_degraded()
+            line_sent = True
+            yield dict({"speaker": speaker, "text": text, "audio": first}, **extra)
+            for index, audio_b64 in enumerate(chunks, 1):
+                if audio_b64:
+                    yield {"event": "audio_chunk", "speaker": speaker, "index": index, "audio": audio_b64}
+        except DeadlineExceeded:
+            degrade("tts", "audio_skipped")
+            yield from flush_degraded()
+            if not line_sent:
+                yield dict({"speaker": speaker, "text": text, "audio": None}, **extra)
+        finally:
+            chunks.close()
+
+    def thinking_events(future):
+        try:
+            return [_thinking_event(wait_for(future, cancel, deadline))]
+        except DeadlineExceeded:
+            degrade("thinking", "thinking_skipped")
+            return flush_degraded()
+
+    detector = ConvergenceDetector(patience=options.get("convergence_patience", CONVERGENCE_PATIENCE),
+                                   state=state.get("convergence"))
+    state["convergence"] = detector.state
+
+    if state["turn"] == 0 and options.get("quality"):
+        yield dict(options["quality"], event="quality")
+
+    dialog = state["dialog"]
+    number_of_questions_limit = options.get("max_turns", 30)
+    report_every = options.get("report_every", 1)
+    while state["turn"] < number_of_questions_limit:
+        i = state["turn"]
+        deadline = Deadline(turn_deadline) if turn_deadline > 0 else None
+        # A generic follow-up makes no sense as the first question, so that one is waited for.
+        opener = not any(message["role"] == "assistant" for message in dialog)
+        if detector.converged:
+            # The last turns added nothing new; close the interview the normal way.
+            yield from speak_line("interviewer", profile.closing_line, "interviewer", profile.interviewer_voice,
+                                  reason="converged")
+            dialog.append({
+                "role": "assistant",
+                "content": [{
                     "type": "text",
-                    "text": interviewer_instructions
-                }
-            ]
-        },
-        {
-            "role": "user",
-            "content": [
-                {
-                    "type": "text",
-                    "text": "start interview"
-                }
-            ]
-        }
-    ]
-    
-    write_report_text = ""
-    full_interview_q_a = ""
-    number_of_questions_limit = 30
-    for i in range(number_of_questions_limit):
+                    "text": f"{profile.closing_line} End interview."
+                }]
+            })
+            print(f"Interview for {patient_name} converged after {i} turns.")
+            break
+
         # Get the next interviewer question from MedGemma
-        interviewer_question_text = medgemma_get_text_response(
-            messages=dialog,
-            temperature=0.1,
-            max_tokens=2048,
-            stream=False
-        )
+        try:
+            interviewer_question_text = _timed_call(
+                state, "interviewer",
+                medgemma_get_text_response,
+                cancel=cancel,
+                deadline=None if opener else deadline,
+                messages=dialog,
+                temperature=0.1,
+                max_tokens=2048,
+                stream=False
+            )
+        except DeadlineExceeded:
+            degrade("interviewer", "canned_question")
+            interviewer_question_text = CANNED_INTERVIEWER_QUESTION
+        if opener and deadline is not None:
+            # The rest of the first turn gets a full budget of its own.
+            deadline = Deadline(turn_deadline)
         # Process optional "thinking" text (if present in the LLM output)
+        thinking_future = None
         thinking_search = re.search('<unused94>(.+?)<unused95>', interviewer_question_text, re.DOTALL)
         if thinking_search:
             thinking_text = thinking_search.group(1)
             interviewer_question_text = interviewer_question_text.replace(f'<unused94>{thinking_text}<unused95>', "")
-            if i == 0:
-                # Only yield the "thinking" summary for the first question
-                thinking_text = gemini_get_text_response(
+            if i == 0 and options.get("thinking_summary", THINKING_SUMMARY):
+                # Only summarize the "thinking" for the first question. The summary runs
+                # in the background while the question is synthesized and sent, and is
+                # emitted as a late event once the patient's answer is in.
+                thinking_future = submit_call(gemini_get_text_response,
                     f"""Provide a summary of up to 100 words containing only the reasoning and planning from this text,
                     do not include instructions, use first person: {thinking_text}""")
-                yield json.dumps({
-                        "speaker": "interviewer thinking",
-                    "text": thinking_text
-                })
 
         # Clean up the text for TTS and display
         clean_interviewer_text = interviewer_question_text.replace("End interview.", "").strip()
 
-        # Generate audio for the interviewer's question using Gemini TTS
-        audio_data, mime_type = synthesize_gemini_tts(f"Speak in a slightly upbeat and brisk manner, as a friendly clinician: {clean_interviewer_text}", INTERVIEWER_VOICE)
-        audio_b64 = None
-        if audio_data and mime_type:
-            audio_b64 = f"data:{mime_type};base64,{base64.b64encode(audio_data).decode('utf-8')}"
-
-        # Yield interviewer message (text and audio)
-        yield json.dumps({
-            "speaker": "interviewer",
-            "text": clean_interviewer_text,
-            "audio": audio_b64
-        })
+        # Generate audio for the interviewer's question using Gemini TTS and
+        # yield interviewer message (text and audio)
+        yield from speak_line("interviewer", clean_interviewer_text, "interviewer", profile.interviewer_voice)
         dialog.append({
             "role": "assistant",
             "content": [{
@@ -341,45 +690,180 @@ def stream_interview(patient_name, condition_name):
         })
         if "End interview" in interviewer_question_text:
             # End the interview loop if the LLM signals completion
+            if thinking_future:
+                yield from thinking_events(thinking_future)
             break
 
         # Get the patient's response from Gemini (roleplay LLM)
-        patient_response_text = gemini_get_text_response(f"""
-        {patient_roleplay_instructions(patient_name, condition_name, full_interview_q_a)}\n\n
-        Question: {interviewer_question_text}""")
-
-        # Generate audio for the patient's response
-        audio_data, mime_type = synthesize_gemini_tts(f"Say this in faster speed, using a sick tone: {patient_response_text}", patient_voice)
-        audio_b64 = None
-        if audio_data and mime_type:
-            audio_b64 = f"data:{mime_type};base64,{base64.b64encode(audio_data).decode('utf-8')}"
-
-        # Yield patient message (text and audio)
-        yield json.dumps({
-            "speaker": "patient",
-            "text": patient_response_text,
-            "audio": audio_b64
-        })
-        dialog.append({
-            "role": "user",
-            "content": [{
-                "type": "text",
-                "text": patient_response_text
-            }]
-        })
-        # Track the full Q&A for context in future LLM calls
-        most_recent_q_a = f"Q: {interviewer_question_text}\nA: {patient_response_text}\n"
-        full_interview_q_a_with_new_q_a = "PREVIOUS Q&A:\n" + full_interview_q_a + "\nNEW Q&A:\n" + most_recent_q_a
-        # Update the report after each Q&A
-        write_report_text = write_report(patient_name, full_interview_q_a_with_new_q_a, write_report_text)
-        full_interview_q_a += most_recent_q_a
-        yield json.dumps({
-            "speaker": "report",
-            "text": write_report_text
-        })
+        patient_prompt = f"""
+        {profile.patient_instructions(patient_name, condition_name, state["full_interview_q_a"], state.get("symptoms"))}\n\n
+        Question: {interviewer_question_text}"""
+        canned_answer = False
+        try:
+            patient_response_text = _timed_call(state, "patient", gemini_get_text_response, patient_prompt,
+                                                cancel=cancel, deadline=deadline)
+        except DeadlineExceeded:
+            # The parked call (or an earlier interview) may have cached an answer by now.
+            patient_response_text = _cached_response(gemini_get_text_response, patient_prompt)
+            canned_answer = not patient_response_text
+            degrade("patient", "canned_answer" if canned_answer else "cached_answer")
+            patient_response_text = patient_response_text or CANNED_PATIENT_ANSWER
+        if thinking_future:
+            yield from thinking_events(thinking_future)
+
+        # Generate audio for the patient's response and yield patient message (text and audio)
+        if canned_answer:
+            yield from speak_line("patient", patient_response_text, "patient", patient_voice, degraded=True)
+            # Filler, not patient history: the exchange stays out of the dialog, the transcript
+            # and the report (and so out of the checkpoint), and the question is asked again.
+            dialog.pop()
+        else:
+            yield from speak_line("patient", patient_response_text, "patient", patient_voice)
+            dialog.append({
+                "role": "user",
+                "content": [{
+                    "type": "text",
+                    "text": patient_response_text
+                }]
+            })
+            if profile.answer_events:
+                yield from profile.answer_events(state, patient_response_text)
+            # Track the full Q&A for context in future LLM calls
+            most_recent_q_a = f"Q: {interviewer_question_text}\nA: {patient_response_text}\n"
+            state["unreported_q_a"] = state.get("unreported_q_a", "") + most_recent_q_a
+            state["unreported_answers"] = state.get("unreported_answers", "") + patient_response_text + "\n"
+            state["unreported_turns"] = state.get("unreported_turns", 0) + 1
+            state["full_interview_q_a"] += most_recent_q_a
+        if canned_answer and state.get("uncounted_canned_answers", 0) < MAX_UNCOUNTED_CANNED_ANSWERS:
+            # The repeated question gets a full turn; past the cap, filler uses up turns so a
+            # provider that keeps missing the deadline cannot stretch the interview forever.
+            state["uncounted_canned_answers"] = state.get("uncounted_canned_answers", 0) + 1
+        else:
+            state["turn"] = i + 1
+        # Update the report after every `report_every` Q&As
+        if state["turn"] % report_every == 0 and state.get("unreported_q_a"):
+            new_answers, new_turns = state["unreported_answers"], state.get("unreported_turns", 1)
+            try:
+                report_event = _update_report(patient_name, state, profile, cancel, deadline)
+            except DeadlineExceeded:
+                # Keep the last report; the unreported answers go into the next update.
+                degrade("report", "report_reused")
+                report_event = None
+            yield from flush_degraded()
+            if report_event:
+                yield report_event
+                if detector.enabled:
+                    # Counted in answered turns, however many a report update covers.
+                    detector.update(new_answers, state["report"], turns=new_turns)
+        yield _CHECKPOINT
+
+    if state.get("unreported_q_a"):
+        # Answers since the last (skipped or late) report update still need to go into the
+        # report. This is the last chance, so it is not bound by a turn deadline.
+        yield _update_report(patient_name, state, profile, cancel)
 
     print(f"""Interview simulation completed for patient: {patient_name}, condition: {condition_name}.
           Patient profile used:
-          {patient_roleplay_instructions(patient_name, condition_name, full_interview_q_a)}""")
+          {profile.patient_instructions(patient_name, condition_name, state["full_interview_q_a"], state.get("symptoms"))}""")
     # Add this at the end to signal end of stream
-    yield json.dumps({"event": "end"})
\ No newline at end of file
+    yield {"event": "end"}
+    state["done"] = True
+    yield _CHECKPOINT
+
+
+def _update_report(patient_name, state, profile, cancel=None, deadline=None):
+    """Folds the Q&As not yet in the report into it and returns the report event."""
+    new_q_a = state["unreported_q_a"]
+    previous_q_a = state["full_interview_q_a"][:len(state["full_interview_q_a"]) - len(new_q_a)]
+    full_interview_q_a_with_new_q_a = "PREVIOUS Q&A:\n" + previous_q_a + "\nNEW Q&A:\n" + new_q_a
+    state["report"] = _timed_call(state, "report", profile.write_report, patient_name, full_interview_q_a_with_new_q_a,
+                                  state["report"], cancel=cancel, deadline=deadline)
+    state["unreported_q_a"] = state["unreported_answers"] = ""
+    state["unreported_turns"] = 0
+    return {
+        "speaker": "report",
+        "text": state["report"]
+    }
+
+
+def _thinking_event(thinking_summary):
+    """Builds the late "interviewer thinking" event."""
+    return {
+        "speaker": "interviewer thinking",
+        "text": thinking_summary,
+        "late": True
+    }
+
+
+def stream_interview_events(patient_name, condition_name, interview_id=None, last_event_id=0, cancel=None,
+                            options=None, profile=PCP_PROFILE):
+    """
+    Streams the interview as (seq, message) pairs, where seq numbers every event from 1.
+
+    When `interview_id` is given, every event is stored and the interview state is
+    checkpointed after each turn. Calling this again with the same id resumes the
+    interview: stored events with seq > `last_event_id` are replayed and the
+    simulation continues from the last checkpoint instead of from turn zero.
+    Setting the `cancel` token stops the simulation with InterviewCancelled.
+    `options` tune the simulation (see _interview_turns); a resumed interview keeps
+    the options it was started with. `profile` selects the kind of interview (PCP_PROFILE
+    by default).
+    """
+    print(f"Starting interview simulation for patient: {patient_name}, condition: {condition_name}")
+    checkpoint = interview_store.load_checkpoint(interview_id) if interview_id else None
+    if checkpoint and (checkpoint["patient"], checkpoint["condition"], checkpoint.get("profile", PCP_PROFILE.name)) != (
+            patient_name, condition_name, profile.name):
+        checkpoint = None
+
+    state, seq = None, 0
+    if checkpoint:
+        replayed = last_event_id
+        for replayed, message in interview_store.load_events(interview_id, last_event_id, checkpoint["seq"]):
+            yield replayed, message
+        if replayed >= checkpoint["seq"]:
+            print(f"Resuming interview {interview_id} from turn {checkpoint['state']['turn']} (event {checkpoint['seq']})")
+            state, seq = checkpoint["state"], checkpoint["seq"]
+            options = checkpoint.get("options", options)
+            # The client may already have events past the checkpoint; those are regenerated
+            # (from the cache) but not sent again.
+            last_event_id = max(last_event_id, seq)
+        else:
+            # Part of the event log is gone; rerun from the start. The LLM and TTS
+            # calls are memoized, so the already-sent events are regenerated from
+            # the cache and filtered out below.
+            last_event_id = replayed
+    if state is None:
+        start = time.perf_counter()
+        with span("setup", trace_id=interview_id, patient=patient_name, condition=condition_name, profile=profile.name):
+            state = run_cancellable(_initial_interview_state, patient_name, profile, cancel=cancel)
+        # Building the first prompt may summarize the EHR, which is worth timing too.
+        state["timings"] = {"setup": [round(time.perf_counter() - start, 3)]}
+    # Spans of this interview are traced under its id (see /api/trace/<interview_id>).
+    state["trace_id"] = interview_id
+    if state["done"]:
+        return
+
+    for payload in _interview_turns(patient_name, condition_name, state, cancel, options, profile):
+        if payload is _CHECKPOINT:
+            if interview_id:
+                interview_store.save_checkpoint(interview_id, {
+                    "patient": patient_name,
+                    "condition": condition_name,
+                    "profile": profile.name,
+                    "seq": seq,
+                    "state": state,
+                    "options": options
+                })
+            continue
+        seq += 1
+        message = json.dumps(payload)
+        if interview_id:
+            interview_store.save_event(interview_id, seq, message)
+        if seq > last_event_id:
+            yield seq, message
+
+
+def stream_interview(patient_name, condition_name):
+    """Streams a fresh interview as serialized JSON messages."""
+    for _, message in stream_interview_events(patient_name, condition_name):
+        yield message
@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Persistent event log and per-turn checkpoints for streamed interviews.
+
+Every event sent over `/api/stream_conversation` gets a sequence number and is
+stored in the interview store, and the interview state is checkpointed after
+each completed turn. A reconnecting client (or a restarted worker) can then
+replay only the events it missed and continue from the last checkpoint.
+
+The store (cache.interview_cache) is a disk cache of its own, with its own size
+limit, so transcripts and audio never end up in the cache archive.
+"""
+
+import os
+import uuid
+from cache import interview_cache
+
+# How long (in seconds) events and checkpoints of an interview are retained.
+CHECKPOINT_TTL = int(os.environ.get("INTERVIEW_CHECKPOINT_TTL", 24 * 60 * 60))
+
+
+def new_interview_id() -> str:
+    """Returns a fresh, URL-safe interview id."""
+    return uuid.uuid4().hex
+
+
+def format_event_id(interview_id: str, seq: int) -> str:
+    """Builds the SSE event id, e.g. "3f2a...:17"."""
+    return f"{interview_id}:{seq}"
+
+
+def parse_event_id(event_id: str | None) -> tuple[str | None, int]:
+    """
+    Parses an SSE event id (as sent back by the browser in `Last-Event-ID`).
+    Returns (interview_id, seq), or (None, 0) if the id is missing or malformed.
+    """
+    if not event_id:
+        return None, 0
+    interview_id, _, seq = event_id.strip().rpartition(":")
+    if not interview_id or not seq.isdigit():
+        return None, 0
+    return interview_id, int(seq)
+
+
+def save_event(interview_id: str, seq: int, message: str):
+    """Stores a single serialized event of an interview."""
+    interview_cache.set(("interview_event", interview_id, seq), message, expire=CHECKPOINT_TTL)
+
+
+def load_event(interview_id: str, seq: int) -> str | None:
+    """Returns a single stored event of an interview, or None if it is not (or no longer) stored."""
+    return interview_cache.get(("interview_event", interview_id, seq))
+
+
+def load_events(interview_id: str, after_seq: int, until_seq: int):
+    """Yields the stored (seq, message) pairs with after_seq < seq <= until_seq."""
+    for seq in range(after_seq + 1, until_seq + 1):
+        message = load_event(interview_id, seq)
+        if message is None:
+            # The log has expired or was never fully written; stop replaying
+            # rather than sending the client a stream with holes in it.
+            return
+        yield seq, message
+
+
+def save_checkpoint(interview_id: str, checkpoint: dict):
+    """Stores the interview checkpoint (state and the last emitted seq)."""
+    interview_cache.set(("interview_checkpoint", interview_id), checkpoint, expire=CHECKPOINT_TTL)
+
+
+def load_checkpoint(interview_id: str) -> dict | None:
+    """Returns the last checkpoint of an interview, or None if there is none."""
+    return interview_cache.get(("interview_checkpoint", interview_id))
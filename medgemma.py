@@ -16,7 +16,9 @@
 import requests
 from auth import create_credentials, get_access_token_refresh_if_needed
 import os
-from cache import cache
+from cache import memo_cache
+from tracing import span
+from cancellation import acquire_upstream
 
 _endpoint_url = os.environ.get('GCP_MEDGEMMA_ENDPOINT')
 
@@ -25,7 +27,7 @@ secret_key_json = os.environ.get('GCP_MEDGEMMA_SERVICE_ACCOUNT_KEY')
 medgemma_credentials = create_credentials(secret_key_json)
 
 # https://cloud.google.com/vertex-ai/docs/reference/rest/v1beta1/projects.locations.endpoints.chat/completions
-@cache.memoize()
+@memo_cache.memoize()
 def medgemma_get_text_response(
     messages: list,
     temperature: float = 0.1,
@@ -61,7 +63,11 @@ def medgemma_get_text_response(
     if presence_penalty is not None: payload["presence_penalty"] = presence_penalty
 
 
-    response = requests.post(_endpoint_url, headers=headers, json=payload, stream=stream, timeout=60)
+    # Only cache misses reach this point: they alone take the upstream rate limit,
+    # and the span marks a real upstream request.
+    acquire_upstream()
+    with span("medgemma.request", max_tokens=max_tokens):
+        response = requests.post(_endpoint_url, headers=headers, json=payload, stream=stream, timeout=60)
     try:
         response.raise_for_status()
         return response.json()["choices"][0]["message"]["content"]
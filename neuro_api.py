@@ -54,6 +54,69 @@ ADDITIONAL_FINDINGS = {
     }
 }
 
+# Simulated patients describe symptoms in everyday words; each phrase is read as the
+# clinical finding it describes before the findings above are matched.
+LAY_TERMS = {
+    'double vision': 'diplopia',
+    'seeing double': 'diplopia',
+    'eye droops': 'ptosis',
+    'eyelid droops': 'ptosis',
+    'drooping eyelid': 'ptosis',
+    'droopy eyelid': 'ptosis',
+    'droopy eye': 'ptosis',
+    'eyelid is drooping': 'ptosis',
+    "can't see": 'vision loss',
+    'lost my vision': 'vision loss',
+    'lost vision': 'vision loss',
+    "can't smell": 'loss of smell',
+    'face is numb': 'facial numbness',
+    'face feels numb': 'facial numbness',
+    'numb face': 'facial numbness',
+    'numbness in my face': 'facial numbness',
+    'face droops': 'facial droop',
+    'face is drooping': 'facial droop',
+    'drooping face': 'facial droop',
+    'crooked smile': 'facial droop',
+    "can't close my eye": 'cannot close eye',
+    'room is spinning': 'vertigo',
+    'room spinning': 'vertigo',
+    'spinning': 'vertigo',
+    'dizzy': 'dizziness',
+    'ringing in my ear': 'tinnitus',
+    'hard to hear': 'hearing loss',
+    "can't hear": 'hearing loss',
+    'trouble swallowing': 'dysphagia',
+    'hard to swallow': 'dysphagia',
+    'choke when i': 'dysphagia',
+    'voice is hoarse': 'hoarseness',
+    'hoarse': 'hoarseness',
+    'slurred': 'dysarthria',
+    'slurring': 'dysarthria',
+    'weak on my': 'weakness',
+    'weak on one side': 'weakness',
+    'arm is weak': 'weakness',
+    'leg is weak': 'weakness',
+    'arm feels weak': 'weakness',
+    'leg feels weak': 'weakness',
+    "can't move my": 'paralysis',
+    'numb on my': 'pain loss',
+    'numb on one side': 'pain loss',
+    'numb on the': 'pain loss',
+    'numbness on': 'pain loss',
+    "can't feel hot": 'temperature loss',
+    "can't feel cold": 'temperature loss',
+    "can't feel pain": 'pain loss',
+    'unsteady': 'ataxia',
+    'off balance': 'ataxia',
+    'lose my balance': 'ataxia',
+    'losing my balance': 'ataxia',
+    'clumsy': 'incoordination',
+    'stumbling': 'ataxia',
+    "doesn't sweat": 'anhidrosis',
+    "don't sweat": 'anhidrosis',
+    'small pupil': 'miosis',
+}
+
 SYNDROMES = [
     {
         'name': 'Weber Syndrome',
@@ -97,7 +160,9 @@ def parse_neurological_findings(text):
     Parse neurological findings from interview text
     Returns structured findings that can be used by NeuroSketch component
     """
-    text_lower = text.lower()
+    text_lower = text.lower().replace('\u2019', "'")
+    # Everyday descriptions count as the clinical findings they describe.
+    text_lower += ' ' + ' '.join(term for phrase, term in LAY_TERMS.items() if phrase in text_lower)
     findings = {
         'cranialNerves': [],
         'tracts': [],
@@ -150,7 +215,11 @@ def parse_neurological_findings(text):
                 })
                 break
     
-    # Try to match syndrome
+    findings['syndrome'] = match_syndrome(findings)
+    return findings
+
+def match_syndrome(findings):
+    """Returns the first syndrome whose ipsilateral findings all appear in `findings`, or None"""
     for syndrome in SYNDROMES:
         syndrome_match = True
         for finding_pattern in syndrome['findings']:
@@ -162,10 +231,40 @@ def parse_neurological_findings(text):
                     break
         
         if syndrome_match and len(findings['cranialNerves']) > 0:
-            findings['syndrome'] = syndrome
-            break
-    
-    return findings
+            return syndrome
+    return None
+
+def merge_findings(previous, new):
+    """
+    Adds the findings parsed from a new piece of text to the accumulated findings.
+    Returns (merged findings, findings that were not known before)
+    """
+    merged = {
+        'cranialNerves': list(previous['cranialNerves']) if previous else [],
+        'tracts': list(previous['tracts']) if previous else [],
+        'additional': list(previous['additional']) if previous else [],
+        'level': previous['level'] if previous else None,
+        'syndrome': None
+    }
+    added = {'cranialNerves': [], 'tracts': [], 'additional': []}
+    keys = {'cranialNerves': 'cn', 'tracts': 'tract', 'additional': 'name'}
+    for group, key in keys.items():
+        known = {(item[key], item['side']) for item in merged[group]}
+        for item in new[group]:
+            if (item[key], item['side']) not in known:
+                known.add((item[key], item['side']))
+                merged[group].append(item)
+                added[group].append(item)
+    merged['level'] = merged['level'] or new['level']
+    merged['syndrome'] = match_syndrome(merged)
+    return merged, added
+
+def format_findings_text(findings):
+    """Formats structured findings as the text input NeuroSketch understands"""
+    parts = [f"{cn['side']} {cn['name'].lower()} nerve ({cn['cn']})" for cn in findings['cranialNerves']]
+    parts += [f"{tract['side']} {tract['name'].lower()}" for tract in findings['tracts']]
+    parts += [f"{finding['side']} {finding['name'].lower()}" for finding in findings['additional']]
+    return ', '.join(parts)
 
 def extract_findings_from_interview(interview_messages):
     """
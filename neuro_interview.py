@@ -17,24 +17,37 @@ def read_neuro_patients_json():
 
 NEURO_PATIENTS = read_neuro_patients_json()["patients"]
 NEURO_SYMPTOMS = read_neuro_symptoms_json()
+NEURO_OPTIONAL_SYMPTOMS_RULE = """- **Handle Optional Symptoms:** Your symptom list may contain optional symptoms (e.g., "I might have..."). 
+          Before the interview starts, you MUST silently decide 'yes' or 'no' for each optional symptom. 
+          A 50% chance for each is a good approach. Remember your choices and be consistent throughout the entire interview.
+        
+        """
 
 def get_neuro_patient(patient_name):
     """Helper function to locate a neurological patient record by name"""
     return next(p for p in NEURO_PATIENTS if p["name"] == patient_name)
 
-def neuro_patient_roleplay_instructions(patient_name, condition_name, previous_answers):
+def neuro_patient_roleplay_instructions(patient_name, condition_name, previous_answers, symptoms=None):
     """
     Generates instructions for LLM to roleplay as a neurological patient
-    with specific brainstem syndrome or neurological condition
+    with specific brainstem syndrome or neurological condition.
+    `symptoms` is the session's resolved symptom list (see optional_symptoms); without it
+    the LLM is told to decide the optional symptoms itself.
     """
     patient = get_neuro_patient(patient_name)
-    symptoms = "\n".join(NEURO_SYMPTOMS[condition_name])
+    if symptoms is None:
+        preamble = "Before the interview begins, silently review the optional symptoms and decide which ones you have."
+        optional_rule = NEURO_OPTIONAL_SYMPTOMS_RULE
+        symptoms = NEURO_SYMPTOMS[condition_name]
+    else:
+        preamble, optional_rule = "Answer as the patient described below.", ""
+    symptoms = "\n".join(symptoms)
     
     condition_info = next(c for c in patient["conditions"] if c["name"] == condition_name)
 
     return f"""
         SYSTEM INSTRUCTION: You are roleplaying as a patient with neurological symptoms. 
-        Before the interview begins, silently review the optional symptoms and decide which ones you have.
+        {preamble}
 
         ### Your Persona ###
         - **Name:** {patient_name}
@@ -58,11 +71,7 @@ def neuro_patient_roleplay_instructions(patient_name, condition_name, previous_a
         ---
 
         ### Critical Rules of Roleplay ###
-        - **Handle Optional Symptoms:** Your symptom list may contain optional symptoms (e.g., "I might have..."). 
-          Before the interview starts, you MUST silently decide 'yes' or 'no' for each optional symptom. 
-          A 50% chance for each is a good approach. Remember your choices and be consistent throughout the entire interview.
-        
-        - **Act as the Patient:** Your entire response must be ONLY what the patient would say. 
+        {optional_rule}- **Act as the Patient:** Your entire response must be ONLY what the patient would say. 
           Do not add external comments, notes, or clarifications.
         
         - **No Medical Knowledge:** You DO NOT know medical terminology like "CN III palsy" or "hemiparesis". 
@@ -0,0 +1,96 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Neurological interview simulation.
+
+Runs the same turn loop as the primary-care simulator (interview_simulator),
+driven by the prompts in neuro_interview. After every patient answer the
+stream carries a "localization" event with the findings parsed from just that
+answer and the accumulated findings, so the NeuroSketch panel updates live.
+"""
+
+from interview_simulator import InterviewProfile, get_neuro_ehr_summary, update_report, stream_interview_events
+from neuro_api import parse_neurological_findings, merge_findings, format_findings_text
+from neuro_interview import (NEURO_SYMPTOMS, get_neuro_patient, neuro_interviewer_roleplay_instructions,
+                             neuro_patient_roleplay_instructions, neuro_report_writer_instructions)
+
+NEURO_INTERVIEW_CLOSING_LINE = "Thank you for answering my questions. I have everything needed to prepare a neurological assessment report for your visit."
+# Neurological patients have no voice of their own; pick one by gender.
+NEURO_PATIENT_VOICES = {"male": "Algenib", "female": "Gacrux"}
+NEURO_REPORT_TEMPLATE = """# Neurological Assessment Report
+
+## Chief Complaint
+
+## History of Present Illness
+
+## Relevant Past Medical History
+
+## Neurological Localization
+
+## Clinical Impression
+"""
+
+
+def neuro_interviewer_instructions(patient_name):
+    return neuro_interviewer_roleplay_instructions(patient_name, get_neuro_ehr_summary(patient_name))
+
+
+def write_neuro_report(patient_name: str, interview_text: str, existing_report: str = None) -> str:
+    """Creates or updates the neurological assessment report, like interview_simulator.write_report."""
+    instructions = neuro_report_writer_instructions(patient_name, get_neuro_ehr_summary(patient_name))
+    return update_report(instructions, interview_text, existing_report or NEURO_REPORT_TEMPLATE)
+
+
+def neuro_patient_voice(patient_name):
+    patient = get_neuro_patient(patient_name)
+    return patient.get("voice") or NEURO_PATIENT_VOICES.get(patient["gender"].lower(), "Algenib")
+
+
+def neuro_conditions(patient_name):
+    """Returns the names of the conditions a neurological patient can be simulated with."""
+    return [condition["name"] for condition in get_neuro_patient(patient_name)["conditions"]]
+
+
+def localization_events(state, answer_text):
+    """Parses only the new answer and yields a localization event if it adds findings."""
+    findings, added = merge_findings(state.get("neuro_findings"), parse_neurological_findings(answer_text))
+    state["neuro_findings"] = findings
+    if any(added.values()):
+        yield {
+            "event": "localization",
+            "new": added,
+            "findings": findings,
+            "findings_text": format_findings_text(findings)
+        }
+
+
+NEURO_PROFILE = InterviewProfile(
+    name="neuro",
+    get_patient=get_neuro_patient,
+    symptoms=NEURO_SYMPTOMS,
+    interviewer_instructions=neuro_interviewer_instructions,
+    patient_instructions=neuro_patient_roleplay_instructions,
+    write_report=write_neuro_report,
+    closing_line=NEURO_INTERVIEW_CLOSING_LINE,
+    patient_voice=neuro_patient_voice,
+    answer_events=localization_events
+)
+
+
+def stream_neuro_interview_events(patient_name, condition_name, interview_id=None, last_event_id=0, cancel=None,
+                                  options=None):
+    """Streams a neurological interview as (seq, message) pairs; see stream_interview_events."""
+    return stream_interview_events(patient_name, condition_name, interview_id, last_event_id, cancel, options,
+                                   profile=NEURO_PROFILE)
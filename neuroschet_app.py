@@ -4,6 +4,7 @@ Main application with dynamic case generation and adaptive learning
 """
 
 from flask import Flask, jsonify, request, send_from_directory
+import base64
 from flask_cors import CORS
 import os
 import json
@@ -14,7 +15,7 @@ from case_generator import get_case_generator
 from case_database import get_case_database
 from adaptive_engine import get_adaptive_engine
 from ai_conversation import get_ai_conversation
-from tts_service import get_tts_service
+from tts_service import get_tts_service, register_tts_routes
 from neuro_api import parse_neurological_findings, SYNDROMES, CRANIAL_NERVES
 
 app = Flask(__name__, static_folder='frontend/build', static_url_path='')
@@ -30,6 +31,9 @@ tts_service = get_tts_service()
 # Store active sessions
 active_sessions = {}
 
+# GET /api/stream_audio/<session_id>?text=...: patient speech streamed while it is synthesized
+register_tts_routes(app, lambda session_id: active_sessions.get(session_id, {}).get('patient'))
+
 @app.route('/')
 def serve_frontend():
     """Serve the React frontend"""
@@ -236,14 +240,12 @@ def generate_audio(session_id):
     patient = session['patient']
     
     # Generate audio
-    audio_base64 = tts_service.generate_speech(
-        text,
-        patient.get('age', 50),
-        patient.get('gender', 'Male')
-    )
+    audio_bytes = tts_service.generate_speech(text, patient)
+    if not audio_bytes:
+        return jsonify({"error": "Audio generation not available"}), 503
     
     return jsonify({
-        "audio": audio_base64,
+        "audio": base64.b64encode(audio_bytes).decode('utf-8'),
         "format": "mp3"
     })
 
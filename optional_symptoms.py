@@ -0,0 +1,68 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Seeded decisions for optional symptoms.
+
+Symptom lists mark optional symptoms with "might" ("I might have a cough.").
+By default the patient LLM is asked to decide them silently on every call.
+With a seed, the decisions are made once per session with a seeded RNG and the
+patient prompt only lists the resolved symptoms, so it is shorter, identical on
+every turn, and memoized answers are shared by all sessions with the same seed.
+"""
+
+import os
+import random
+import re
+
+# Default seed for sessions that do not pass one; empty keeps the LLM deciding.
+OPTIONAL_SYMPTOM_SEED = os.environ.get("OPTIONAL_SYMPTOM_SEED", "")
+# Probability that an optional symptom is present.
+OPTIONAL_SYMPTOM_PROBABILITY = float(os.environ.get("OPTIONAL_SYMPTOM_PROBABILITY", 0.5))
+
+_HEDGE = re.compile(r"\bmight (?:possibly |even )?", re.IGNORECASE)
+
+
+def is_optional(symptom: str) -> bool:
+    return bool(_HEDGE.search(symptom))
+
+
+def affirm(symptom: str) -> str:
+    """Rewrites an optional symptom as a present one ("I might have a cough." -> "I have a cough.")."""
+    match = _HEDGE.search(symptom)
+    subject, rest = symptom[:match.start()], symptom[match.end():]
+    if rest.startswith("be "):
+        rest = ("am " if re.search(r"\bI\s*$", subject) else "is ") + rest[3:]
+    return subject + rest
+
+
+def resolve_symptoms(symptoms: list[str], seed: str) -> list[str]:
+    """
+    Decides every optional symptom with an RNG seeded by `seed` and returns the symptoms
+    the patient has. When only a trailing ", and I might ..." clause is optional, the
+    first clause is always kept.
+    """
+    rng = random.Random(f"{seed}\n" + "\n".join(symptoms))
+    resolved = []
+    for symptom in symptoms:
+        if not is_optional(symptom):
+            resolved.append(symptom)
+            continue
+        present = rng.random() < OPTIONAL_SYMPTOM_PROBABILITY
+        head, _, tail = symptom.partition(", and ")
+        if tail and not is_optional(head):
+            resolved.append(f"{head}, and {affirm(tail)}" if present else head.rstrip(".") + ".")
+        elif present:
+            resolved.append(affirm(symptom))
+    return resolved
@@ -0,0 +1,139 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+PCM post-processing for synthesized speech, before it is encoded and cached.
+
+Works on 16-bit mono PCM through `np.frombuffer` views: silence trimming only
+slices the view, and a copy is made only when the samples actually change
+(gain or resampling).
+
+    pcm, rate = process_pcm(pcm, 24000)
+"""
+
+import os
+
+import numpy as np
+
+PCM_POSTPROCESS = os.environ.get("PCM_POSTPROCESS", "true").lower() == "true"
+# Leading/trailing audio quieter than this (dBFS, per 10 ms window) is trimmed.
+PCM_SILENCE_THRESHOLD_DB = float(os.environ.get("PCM_SILENCE_THRESHOLD_DB", -45))
+# Silence kept before and after the speech, in milliseconds.
+PCM_SILENCE_PAD_MS = int(os.environ.get("PCM_SILENCE_PAD_MS", 80))
+# Loudness (RMS, dBFS) clips are normalized to; peaks are kept below PCM_PEAK_LIMIT.
+PCM_TARGET_DBFS = float(os.environ.get("PCM_TARGET_DBFS", -20))
+PCM_PEAK_LIMIT = 0.98
+# Sample rate clips are downsampled to; 0 keeps the rate TTS returned.
+PCM_TARGET_RATE = int(os.environ.get("PCM_TARGET_RATE", 0))
+
+_WINDOW_MS = 10
+_FULL_SCALE = 32768.0
+
+
+def _dbfs(rms):
+    return 20 * np.log10(np.maximum(rms, 1e-9) / _FULL_SCALE)
+
+
+def trim_silence(samples: np.ndarray, rate: int, threshold_db: float = PCM_SILENCE_THRESHOLD_DB,
+                 pad_ms: int = PCM_SILENCE_PAD_MS) -> np.ndarray:
+    """Returns a view of `samples` without the leading and trailing silence."""
+    window = max(1, rate * _WINDOW_MS // 1000)
+    usable = len(samples) // window * window
+    if usable == 0:
+        return samples
+    frames = samples[:usable].reshape(-1, window).astype(np.float32)
+    loud = np.flatnonzero(_dbfs(np.sqrt(np.mean(frames * frames, axis=1))) > threshold_db)
+    if len(loud) == 0:
+        return samples
+    pad = rate * pad_ms // 1000
+    start = max(0, loud[0] * window - pad)
+    end = min(len(samples), (loud[-1] + 1) * window + pad)
+    return samples[start:end]
+
+
+def normalize_loudness(samples: np.ndarray, target_dbfs: float = PCM_TARGET_DBFS) -> np.ndarray:
+    """Scales `samples` to the target RMS loudness, without letting peaks clip."""
+    if len(samples) == 0:
+        return samples
+    as_float = samples.astype(np.float32)
+    rms = float(np.sqrt(np.mean(as_float * as_float)))
+    peak = float(np.max(np.abs(as_float)))
+    if rms == 0 or peak == 0:
+        return samples
+    gain = min(10 ** ((target_dbfs - float(_dbfs(rms))) / 20), PCM_PEAK_LIMIT * _FULL_SCALE / peak)
+    if abs(20 * np.log10(gain)) < 0.5:
+        return samples  # Inaudible change; keep the view.
+    return np.clip(as_float * gain, -_FULL_SCALE, _FULL_SCALE - 1).astype(np.int16)
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+    """
+    Downsamples to `target_rate`: box-filtered decimation for integer ratios, otherwise
+    a moving-average low-pass followed by linear interpolation. Never upsamples.
+    """
+    if not target_rate or target_rate >= rate or len(samples) == 0:
+        return samples
+    if rate % target_rate == 0:
+        factor = rate // target_rate
+        usable = len(samples) // factor * factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1).astype(np.int16)
+    width = int(np.ceil(rate / target_rate))
+    smoothed = np.convolve(samples.astype(np.float32), np.full(width, 1.0 / width, dtype=np.float32), mode="same")
+    positions = np.arange(int(len(samples) * target_rate / rate)) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), smoothed).astype(np.int16)
+
+
+def segment_offsets(pcm: bytes, rate: int, weights: list[float], min_gap_ms: int = 150,
+                    threshold_db: float = PCM_SILENCE_THRESHOLD_DB) -> list[dict]:
+    """
+    Splits 16-bit mono PCM into len(weights) consecutive segments (e.g. the turns of a
+    dialogue, weighted by their text length). Each boundary is placed at the pause of at
+    least `min_gap_ms` nearest to where the weights put it, or at that point if there is
+    no pause left. Returns [{"start_ms", "end_ms"}, ...].
+    """
+    samples = np.frombuffer(pcm, dtype="<i2", count=len(pcm) // 2)
+    total_ms = len(samples) * 1000 / rate if rate else 0
+    window = max(1, rate * _WINDOW_MS // 1000)
+    usable = len(samples) // window * window
+    gaps = np.empty(0)
+    if usable:
+        frames = samples[:usable].reshape(-1, window).astype(np.float32)
+        quiet = (_dbfs(np.sqrt(np.mean(frames * frames, axis=1))) <= threshold_db).astype(np.int8)
+        edges = np.diff(np.concatenate(([0], quiet, [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        long_enough = (ends - starts) * _WINDOW_MS >= min_gap_ms
+        gaps = (starts[long_enough] + ends[long_enough]) / 2 * _WINDOW_MS
+
+    weights = np.asarray(weights, dtype=np.float64)
+    expected = np.cumsum(weights)[:-1] / max(weights.sum(), 1e-9) * total_ms
+    boundaries = []
+    for point in expected:
+        candidates = gaps[gaps > (boundaries[-1] if boundaries else 0)]
+        boundaries.append(float(candidates[np.argmin(np.abs(candidates - point))]) if len(candidates) else float(point))
+    edges_ms = [0.0] + boundaries + [total_ms]
+    return [{"start_ms": round(edges_ms[k]), "end_ms": round(edges_ms[k + 1])} for k in range(len(weights))]
+
+
+def process_pcm(pcm: bytes, rate: int, bits_per_sample: int = 16) -> tuple[bytes, int]:
+    """
+    Trims silence, normalizes loudness and optionally downsamples little-endian mono PCM.
+    Returns the processed PCM and its sample rate; anything but 16-bit PCM is returned as is.
+    """
+    if not PCM_POSTPROCESS or bits_per_sample != 16 or len(pcm) < 2:
+        return pcm, rate
+    samples = np.frombuffer(pcm, dtype="<i2", count=len(pcm) // 2)
+    samples = trim_silence(samples, rate)
+    samples = normalize_loudness(samples)
+    samples = resample(samples, rate, PCM_TARGET_RATE)
+    return samples.astype("<i2", copy=False).tobytes(), min(rate, PCM_TARGET_RATE or rate)
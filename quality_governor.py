@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Load-adaptive interview quality.
+
+Under peak load everyone gets a shorter interview rather than half of the
+users waiting. The governor looks at the scheduler queue depth (waiting jobs
+per worker) and at the recent upstream LLM latency, and picks a quality level
+for every interview that starts:
+
+    0 full       30 turns, report after every answer, thinking summary, TTS
+    1 reduced    20 turns, report every 2nd answer
+    2 lean       14 turns, report every 3rd answer, no thinking summary
+    3 text_only  10 turns, report every 3rd answer, no thinking summary, no TTS
+
+Degrading is immediate; recovering goes one level at a time, once load has
+stayed below that level's thresholds for QUALITY_RECOVERY_SECONDS.
+"""
+
+import os
+import threading
+import time
+
+QUALITY_GOVERNOR = os.environ.get("QUALITY_GOVERNOR", "true").lower() == "true"
+# Waiting jobs per worker at which levels 1, 2 and 3 kick in.
+QUALITY_QUEUE_STEPS = [float(x) for x in os.environ.get("QUALITY_QUEUE_STEPS", "0.5,1,2").split(",")]
+# Average upstream LLM call latency (seconds) at which levels 1, 2 and 3 kick in.
+QUALITY_LATENCY_STEPS = [float(x) for x in os.environ.get("QUALITY_LATENCY_STEPS", "10,20,30").split(",")]
+QUALITY_RECOVERY_SECONDS = float(os.environ.get("QUALITY_RECOVERY_SECONDS", 30))
+# Weight of the newest sample in the latency moving average.
+LATENCY_SMOOTHING = 0.2
+
+QUALITY_LEVELS = [
+    {"level": 0, "name": "full", "max_turns": 30, "report_every": 1, "thinking_summary": True, "tts": True},
+    {"level": 1, "name": "reduced", "max_turns": 20, "report_every": 2, "thinking_summary": True, "tts": True},
+    {"level": 2, "name": "lean", "max_turns": 14, "report_every": 3, "thinking_summary": False, "tts": True},
+    {"level": 3, "name": "text_only", "max_turns": 10, "report_every": 3, "thinking_summary": False, "tts": False},
+]
+
+
+def _step(value: float, steps: list[float]) -> int:
+    return sum(1 for threshold in steps if value >= threshold)
+
+
+class QualityGovernor:
+    """Chooses the quality level of new interviews from the current load."""
+
+    def __init__(self, queue_steps=QUALITY_QUEUE_STEPS, latency_steps=QUALITY_LATENCY_STEPS,
+                 recovery_seconds=QUALITY_RECOVERY_SECONDS, enabled=QUALITY_GOVERNOR):
+        self.queue_steps = queue_steps
+        self.latency_steps = latency_steps
+        self.recovery_seconds = recovery_seconds
+        self.enabled = enabled
+        self.level = 0
+        self.latency = None  # Moving average of upstream LLM call latency, in seconds.
+        self._calm_since = None
+        self._lock = threading.Lock()
+
+    def record_latency(self, seconds: float):
+        """Feeds the duration of one upstream LLM call."""
+        with self._lock:
+            if self.latency is None:
+                self.latency = seconds
+            else:
+                self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+
+    def target_level(self, scheduler_stats: dict) -> int:
+        """The level the current load calls for, ignoring hysteresis."""
+        queue_depth = scheduler_stats["queued"] / max(1, scheduler_stats["workers"])
+        latency = self.latency or 0.0
+        return min(len(QUALITY_LEVELS) - 1,
+                   max(_step(queue_depth, self.queue_steps), _step(latency, self.latency_steps)))
+
+    def update(self, scheduler_stats: dict) -> int:
+        """Re-evaluates the load and returns the current level."""
+        if not self.enabled:
+            return 0
+        target = self.target_level(scheduler_stats)
+        now = time.monotonic()
+        with self._lock:
+            if target >= self.level:
+                self.level = target
+                self._calm_since = None
+            elif self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.recovery_seconds:
+                self.level -= 1
+                self._calm_since = now if self.level > target else None
+            return self.level
+
+    def apply(self, options: dict, scheduler_stats: dict) -> dict:
+        """
+        Returns `options` with the settings of the current level. A level only ever
+        takes work away: options the client already turned off stay off.
+        """
+        settings = QUALITY_LEVELS[self.update(scheduler_stats)]
+        options = dict(options)
+        options["quality"] = {"level": settings["level"], "name": settings["name"]}
+        options["max_turns"] = min(options.get("max_turns", settings["max_turns"]), settings["max_turns"])
+        options["report_every"] = max(options.get("report_every", 1), settings["report_every"])
+        if not settings["thinking_summary"]:
+            options["thinking_summary"] = False
+        if not settings["tts"]:
+            options["tts"] = False
+        return options
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "level": self.level,
+                "name": QUALITY_LEVELS[self.level]["name"],
+                "upstream_latency_s": round(self.latency, 3) if self.latency is not None else None
+            }
+
+
+# Singleton instance
+_quality_governor = None
+
+def get_quality_governor():
+    """Get or create the quality governor instance"""
+    global _quality_governor
+    if _quality_governor is None:
+        _quality_governor = QualityGovernor()
+    return _quality_governor
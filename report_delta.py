@@ -0,0 +1,88 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Line-level deltas for the report events of an interview stream.
+
+In delta mode a report event carries either the full text (a snapshot) or a
+list of line operations against the previous version:
+    ["=", n]        keep the next n lines
+    ["-", n]        drop the next n lines
+    ["+", [lines]]  insert these lines
+A snapshot is sent for the first report of every connection, every
+REPORT_SNAPSHOT_INTERVAL versions, and whenever the delta would not be smaller.
+"""
+
+import difflib
+import json
+import os
+
+REPORT_SNAPSHOT_INTERVAL = int(os.environ.get("REPORT_SNAPSHOT_INTERVAL", 5))
+
+
+def diff_lines(old: str, new: str) -> list:
+    """Returns the line operations that turn `old` into `new`."""
+    old_lines, new_lines = old.split("\n"), new.split("\n")
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i2 - i1])
+            continue
+        if tag in ("delete", "replace"):
+            ops.append(["-", i2 - i1])
+        if tag in ("insert", "replace"):
+            ops.append(["+", new_lines[j1:j2]])
+    return ops
+
+
+def apply_ops(old: str, ops: list) -> str:
+    """Applies line operations produced by diff_lines to `old`."""
+    old_lines = old.split("\n")
+    new_lines, position = [], 0
+    for op, arg in ops:
+        if op == "=":
+            new_lines.extend(old_lines[position:position + arg])
+            position += arg
+        elif op == "-":
+            position += arg
+        elif op == "+":
+            new_lines.extend(arg)
+    return "\n".join(new_lines)
+
+
+class ReportDeltaEncoder:
+    """Rewrites the report events of one connection into snapshots and deltas."""
+
+    def __init__(self, snapshot_interval=REPORT_SNAPSHOT_INTERVAL):
+        self.snapshot_interval = snapshot_interval
+        self.version = 0
+        self.previous = None
+
+    def encode(self, message: str) -> str:
+        """Returns the message to send; anything but a report event passes through unchanged."""
+        payload = json.loads(message)
+        if payload.get("speaker") != "report":
+            return message
+
+        text = payload["text"]
+        self.version += 1
+        encoded = {"speaker": "report", "version": self.version, "text": text}
+        if self.previous is not None and self.version % self.snapshot_interval != 0:
+            delta = {"speaker": "report", "version": self.version, "base": self.version - 1,
+                     "ops": diff_lines(self.previous, text)}
+            if len(json.dumps(delta)) < len(json.dumps(encoded)):
+                encoded = delta
+        self.previous = text
+        return json.dumps(encoded)
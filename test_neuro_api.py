@@ -0,0 +1,37 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the neurological findings parser behind the live localization events."""
+
+from neuro_api import merge_findings, parse_neurological_findings
+
+
+def test_lay_language_answer_localizes():
+    # Simulated neuro patients are told to avoid medical terms.
+    findings = parse_neurological_findings("Well, I've had double vision and my left eye droops since Tuesday.")
+    assert [(cn["cn"], cn["side"]) for cn in findings["cranialNerves"]] == [("CN III", "left")]
+    assert findings["level"] == "midbrain"
+
+
+def test_lay_language_sensory_answer_adds_findings():
+    # What localization_events does with each new answer.
+    findings, added = merge_findings(None, parse_neurological_findings("I'm numb on my right side."))
+    assert [(tract["tract"], tract["side"]) for tract in added["tracts"]] == [("spinothalamic", "right")]
+    findings, added = merge_findings(findings, parse_neurological_findings("I'm still numb on my right side."))
+    assert not any(added.values())
+
+
+def test_answer_without_neurological_symptoms():
+    findings = parse_neurological_findings("I have had a mild headache and I am tired.")
+    assert not findings["cranialNerves"] and not findings["tracts"] and not findings["additional"]
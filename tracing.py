@@ -0,0 +1,177 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Lightweight per-interview tracing.
+
+    with span("report", trace_id=interview_id, turn=3):
+        ...  # nested span() calls join the same trace
+
+Spans are linked by a trace id (the interview or session id) and written, one
+JSON object per line, to TRACE_EXPORT_PATH when they finish. `load_trace` and
+`waterfall` rebuild the timeline of a single interview from that file. Code
+running outside a trace records nothing, so instrumenting a function costs
+close to nothing when tracing is off.
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+TRACING = os.environ.get("TRACING", "true").lower() == "true"
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH", os.path.join(os.environ.get("CACHE_DIR", "/cache"), "traces.jsonl"))
+# The export file is rotated to <path>.1 once it grows past this size.
+TRACE_MAX_BYTES = int(os.environ.get("TRACE_MAX_BYTES", 50 * 1024 * 1024))
+
+_current_trace = contextvars.ContextVar("trace_id", default=None)
+_current_span = contextvars.ContextVar("span_id", default=None)
+_export_lock = threading.Lock()
+
+
+def current_trace_id():
+    return _current_trace.get()
+
+
+@contextlib.contextmanager
+def span(name: str, trace_id: str = None, **attributes):
+    """
+    Times the enclosed block as a span. `trace_id` starts (or joins) a trace; without
+    it the span joins the current trace, and is not recorded if there is none.
+    Yields the span's attribute dict, so callers can add attributes while it runs.
+    """
+    trace_id = trace_id or _current_trace.get()
+    if not TRACING or not trace_id:
+        yield attributes
+        return
+    span_id = uuid.uuid4().hex[:16]
+    parent_id = _current_span.get() if _current_trace.get() == trace_id else None
+    trace_token = _current_trace.set(trace_id)
+    span_token = _current_span.set(span_id)
+    start_wall, start = time.time(), time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        _export({
+            "trace_id": trace_id,
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "name": name,
+            "start": round(start_wall, 6),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            "thread": threading.current_thread().name,
+            "attributes": attributes,
+            "error": error
+        })
+
+
+def _export(record: dict):
+    try:
+        line = json.dumps(record, default=str) + "\n"
+        with _export_lock:
+            if os.path.exists(TRACE_EXPORT_PATH) and os.path.getsize(TRACE_EXPORT_PATH) > TRACE_MAX_BYTES:
+                os.replace(TRACE_EXPORT_PATH, TRACE_EXPORT_PATH + ".1")
+            with open(TRACE_EXPORT_PATH, 'a') as f:
+                f.write(line)
+    except Exception as e:
+        # Tracing must never break an interview.
+        logging.warning("Could not export trace span: %s", e)
+
+
+def load_trace(trace_id: str) -> list[dict]:
+    """Returns the exported spans of one trace, oldest first."""
+    spans = []
+    for path in (TRACE_EXPORT_PATH + ".1", TRACE_EXPORT_PATH):
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r') as f:
+            for line in f:
+                if trace_id not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("trace_id") == trace_id:
+                    spans.append(record)
+    return sorted(spans, key=lambda record: record["start"])
+
+
+def waterfall(spans: list[dict]) -> dict:
+    """Lays the spans of a trace out on a common timeline (offsets in ms from the first span)."""
+    if not spans:
+        return {"spans": [], "duration_ms": 0}
+    origin = spans[0]["start"]
+    by_id = {record["span_id"]: record for record in spans}
+
+    def depth(record):
+        level = 0
+        while record.get("parent_id") in by_id:
+            record = by_id[record["parent_id"]]
+            level += 1
+        return level
+
+    rows = [{
+        "name": record["name"],
+        "offset_ms": round((record["start"] - origin) * 1000, 1),
+        "duration_ms": record["duration_ms"],
+        "depth": depth(record),
+        "thread": record["thread"],
+        "attributes": record["attributes"],
+        "error": record["error"]
+    } for record in spans]
+    end = max(row["offset_ms"] + row["duration_ms"] for row in rows)
+    return {"trace_id": spans[0]["trace_id"], "duration_ms": round(end, 1), "spans": rows}
+
+
+def waterfall_text(view: dict, width: int = 60) -> str:
+    """Renders a waterfall as fixed-width text bars."""
+    total = view["duration_ms"] or 1
+    lines = [f"trace {view.get('trace_id', '')}: {total / 1000:.2f}s"]
+    for row in view["spans"]:
+        begin = int(row["offset_ms"] / total * width)
+        length = max(1, int(row["duration_ms"] / total * width))
+        label = ("  " * row["depth"] + row["name"])[:28]
+        flag = " !" if row["error"] else ""
+        lines.append(f"{label:<28} |{' ' * begin}{'#' * length}{' ' * max(0, width - begin - length)}| "
+                     f"{row['duration_ms'] / 1000:7.2f}s{flag}")
+    return "\n".join(lines)
+
+
+def register_trace_routes(app):
+    """Registers GET /api/trace/<trace_id> (JSON waterfall; ?format=text for text bars)."""
+    from flask import Response, jsonify, request
+
+    @app.route("/api/trace/<trace_id>", methods=["GET"])
+    def get_trace(trace_id):
+        """Returns the span waterfall of one interview or conversation session."""
+        spans = load_trace(trace_id)
+        if not spans:
+            return jsonify({"error": f"No trace found for {trace_id}"}), 404
+        view = waterfall(spans)
+        if request.args.get("format") == "text":
+            return Response(waterfall_text(view), mimetype="text/plain")
+        return jsonify(view)
+
+    return app
@@ -0,0 +1,162 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Dedicated executor for Gemini TTS requests.
+
+Every TTS request of the process runs on TTS_WORKERS worker threads, so bursts of
+interviews queue here instead of all hitting the provider at once. Each worker
+keeps its own model client for its lifetime. Requests are started at most
+TTS_MAX_QPS per second, in priority order: audio a live interview is waiting for
+goes ahead of prefetch and warm-up work.
+
+    with tts_priority(PRIORITY_PREFETCH):
+        synthesize_gemini_tts(text, voice)   # queued behind live requests
+"""
+
+import concurrent.futures
+import contextlib
+import contextvars
+import itertools
+import os
+import queue
+import threading
+import time
+
+from cancellation import RateLimiter
+
+# Concurrent TTS requests per process.
+TTS_WORKERS = int(os.environ.get("TTS_WORKERS", 4))
+# TTS requests started per second by this process; 0 disables the cap.
+TTS_MAX_QPS = float(os.environ.get("TTS_MAX_QPS", 0))
+
+PRIORITY_LIVE = 0
+PRIORITY_PREFETCH = 1
+PRIORITY_NAMES = {PRIORITY_LIVE: "live", PRIORITY_PREFETCH: "prefetch"}
+
+_priority = contextvars.ContextVar("tts_priority", default=PRIORITY_LIVE)
+
+
+@contextlib.contextmanager
+def tts_priority(priority: int):
+    """TTS requests made in this block (and the calls it starts on the call pool) get `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TTSExecutor:
+    """Priority queue of TTS requests served by worker threads with their own model clients."""
+
+    def __init__(self, model_factory, workers=TTS_WORKERS, max_qps=TTS_MAX_QPS):
+        self.model_factory = model_factory
+        self.workers = max(1, workers)
+        self.max_qps = max_qps
+        self._limiter = RateLimiter(max_qps) if max_qps > 0 else None
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._active = 0
+        self._queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+
+    def submit(self, fn, priority: int = None) -> concurrent.futures.Future:
+        """
+        Queues fn(model) and returns its future; `model` is the worker's client. Runs in a copy
+        of the caller's context, at the caller's tts_priority unless `priority` is given.
+        """
+        priority = _priority.get() if priority is None else priority
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._start_workers()
+            self._queued[PRIORITY_NAMES.get(priority, "prefetch")] += 1
+        self._queue.put((priority, next(self._sequence), time.monotonic(), future, contextvars.copy_context(), fn))
+        return future
+
+    def run(self, fn, priority: int = None):
+        """Runs fn(model) on a TTS worker and returns its result."""
+        return self.submit(fn, priority).result()
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"tts-worker-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _work(self):
+        model = self.model_factory()
+        while True:
+            item = self._queue.get()
+            if self._limiter is not None:
+                self._limiter.acquire()
+                # Live requests may have arrived while waiting for the rate limit; put the job
+                # back (it keeps its place) and take whichever is first now.
+                self._queue.put(item)
+                item = self._queue.get()
+            priority, _, queued_at, future, context, fn = item
+            with self._lock:
+                self._queued[PRIORITY_NAMES.get(priority, "prefetch")] -= 1
+                self._active += 1
+                self._total_wait += time.monotonic() - queued_at
+            if not future.set_running_or_notify_cancel():
+                with self._lock:
+                    self._active -= 1
+                continue
+            try:
+                future.set_result(context.run(fn, model))
+                failed = False
+            except BaseException as e:
+                future.set_exception(e)
+                failed = True
+            with self._lock:
+                self._active -= 1
+                self._completed += not failed
+                self._failed += failed
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(self._queued.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self._completed + self._failed + self._active
+            return {
+                "workers": self.workers,
+                "max_qps": self.max_qps,
+                "active": self._active,
+                "queue_depth": sum(self._queued.values()),
+                "queued": dict(self._queued),
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_queue_wait_s": round(self._total_wait / started, 3) if started else 0.0
+            }
+
+
+# Singleton instance
+_tts_executor = None
+_tts_executor_lock = threading.Lock()
+
+def get_tts_executor():
+    """Get or create the TTS executor"""
+    global _tts_executor
+    with _tts_executor_lock:
+        if _tts_executor is None:
+            from gemini_tts import new_tts_model
+            _tts_executor = TTSExecutor(new_tts_model)
+        return _tts_executor
@@ -1,9 +1,20 @@
 """
 Text-to-Speech Service using ElevenLabs
+
+Synthesized audio is cached in the shared diskcache, keyed by voice, model and
+normalized text, so repeated lines are never synthesized twice. `stream_speech`
+forwards ElevenLabs audio chunks as they arrive and caches the clip once it is
+complete.
 """
 
 import os
+import re
 from elevenlabs import ElevenLabs, VoiceSettings
+from cache import memo_cache
+
+ELEVENLABS_MODEL_ID = os.environ.get("ELEVENLABS_MODEL_ID", "eleven_turbo_v2_5")
+# Size of the pieces cached audio is streamed in.
+STREAM_CHUNK_BYTES = 32 * 1024
 
 class TTSService:
     def __init__(self):
@@ -39,18 +50,32 @@ class TTSService:
         voice_key = f"{gender}_{category}"
         return self.voice_map.get(voice_key, self.voice_map["male_middle"])
     
-    def generate_speech(self, text, patient):
-        """Generate speech audio from text"""
+    def cache_key(self, text, voice_id, model_id=ELEVENLABS_MODEL_ID):
+        """Cache key of a clip; whitespace differences in the text do not matter."""
+        return ("elevenlabs_tts", voice_id, model_id, re.sub(r"\s+", " ", text).strip())
+
+    def stream_speech(self, text, patient):
+        """
+        Yields MP3 audio chunks for `text` in the patient's voice as they arrive from
+        ElevenLabs (or from the cache). The clip is cached once it has fully arrived.
+        Yields nothing if speech is unavailable.
+        """
+        voice_id = self.get_voice_for_patient(patient)
+        key = self.cache_key(text, voice_id)
+        cached = memo_cache.get(key)
+        if cached is not None:
+            for start in range(0, len(cached), STREAM_CHUNK_BYTES):
+                yield cached[start:start + STREAM_CHUNK_BYTES]
+            return
         if not self.client:
-            return None
-        
+            return
+
+        chunks = []
         try:
-            voice_id = self.get_voice_for_patient(patient)
-            
-            audio = self.client.text_to_speech.convert(
+            audio = self.client.text_to_speech.convert_as_stream(
                 voice_id=voice_id,
                 text=text,
-                model_id="eleven_turbo_v2_5",
+                model_id=ELEVENLABS_MODEL_ID,
                 voice_settings=VoiceSettings(
                     stability=0.5,
                     similarity_boost=0.75,
@@ -58,20 +83,58 @@ class TTSService:
                     use_speaker_boost=True
                 )
             )
-            
-            # Convert generator to bytes
-            audio_bytes = b"".join(audio)
-            return audio_bytes
-            
+            for chunk in audio:
+                if chunk:
+                    chunks.append(chunk)
+                    yield chunk
         except Exception as e:
             print(f"Error generating speech: {e}")
-            return None
+            return
+        # Only complete clips are cached; a client that hangs up early leaves nothing behind.
+        memo_cache.set(key, b"".join(chunks))
+
+    def generate_speech(self, text, patient):
+        """Generate speech audio (MP3 bytes) from text for a patient dict; None if unavailable"""
+        audio_bytes = b"".join(self.stream_speech(text, patient))
+        return audio_bytes or None
     
     def is_available(self):
         """Check if TTS service is available"""
         return self.client is not None
 
 
+def register_tts_routes(app, get_session_patient):
+    """
+    Registers GET /api/stream_audio/<session_id>?text=..., which streams the patient's
+    speech as MP3 while it is being synthesized (usable directly as an <audio> src).
+    `get_session_patient(session_id)` returns the session's patient dict, or None.
+    """
+    from flask import Response, jsonify, request, stream_with_context
+
+    @app.route('/api/stream_audio/<session_id>', methods=['GET'])
+    def stream_audio(session_id):
+        """Stream TTS audio for a patient response"""
+        patient = get_session_patient(session_id)
+        if patient is None:
+            return jsonify({"error": "Session not found"}), 404
+        text = request.args.get('text', '')
+        if not text:
+            return jsonify({"error": "No text given"}), 400
+        tts_service = get_tts_service()
+        chunks = tts_service.stream_speech(text, patient)
+        first = next(chunks, None)
+        if first is None:
+            return jsonify({"error": "Audio generation not available"}), 503
+
+        def generate():
+            yield first
+            yield from chunks
+
+        return Response(stream_with_context(generate()), mimetype="audio/mpeg")
+
+    return app
+
+
 # Singleton instance
 _tts_service = None
 
@@ -0,0 +1,120 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Background warm-up of the work every first interview would otherwise pay for.
+
+The job summarizes the EHR of every patient in PATIENTS and NEURO_PATIENTS and
+pre-renders the fixed interviewer phrases for every voice that speaks them.
+Results land in the memoized LLM/TTS caches (and the in-memory patient
+records), so the first interview for a patient runs at steady-state latency.
+"""
+
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+
+from interview_simulator import (PATIENTS, PCP_PROFILE, get_ehr_summary_per_patient, get_neuro_ehr_summary,
+                                 synthesize_audio_data_url)
+from neuro_interview import NEURO_PATIENTS
+from neuro_simulator import NEURO_PROFILE
+from tts_executor import tts_priority, PRIORITY_PREFETCH
+
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "false").lower() == "true"
+WARMUP_WORKERS = int(os.environ.get("WARMUP_WORKERS", 4))
+
+# (voice, phrase) for every line an interviewer of any profile always speaks verbatim.
+FIXED_PHRASES = list(dict.fromkeys((profile.interviewer_voice, line)
+                                   for profile in (PCP_PROFILE, NEURO_PROFILE) for line in profile.fixed_lines()))
+
+
+class WarmupJob:
+    """Runs the warm-up tasks on a small thread pool and tracks their progress."""
+
+    def __init__(self, max_workers=WARMUP_WORKERS):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = {"state": "idle", "total": 0, "completed": 0, "failed": 0, "errors": [],
+                        "started_at": None, "finished_at": None}
+
+    def tasks(self):
+        """Returns the list of (description, callable) to run."""
+        tasks = []
+        for patient in PATIENTS:
+            tasks.append((f"EHR summary: {patient['name']}", lambda name=patient["name"]: get_ehr_summary_per_patient(name)))
+        for patient in NEURO_PATIENTS:
+            tasks.append((f"Neuro EHR summary: {patient['name']}", lambda name=patient["name"]: get_neuro_ehr_summary(name)))
+        for voice, phrase in FIXED_PHRASES:
+            tasks.append((f"TTS ({voice}): {phrase[:40]}",
+                          lambda voice=voice, phrase=phrase: self._render(phrase, voice, "interviewer")))
+        return tasks
+
+    @staticmethod
+    def _render(text, voice, style):
+        # Queued behind the audio of live interviews.
+        with tts_priority(PRIORITY_PREFETCH):
+            audio = synthesize_audio_data_url(text, voice, style)
+        if audio is None:
+            raise RuntimeError("TTS returned no audio")
+
+    def start(self) -> bool:
+        """Starts the job in the background; returns False if it is already running."""
+        with self._lock:
+            if self._status["state"] == "running":
+                return False
+            tasks = self.tasks()
+            self._status = {"state": "running", "total": len(tasks), "completed": 0, "failed": 0, "errors": [],
+                            "started_at": time.time(), "finished_at": None}
+            self._thread = threading.Thread(target=self._run, args=(tasks,), name="warmup", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, tasks):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                                                   thread_name_prefix="warmup-task") as executor:
+            futures = {executor.submit(fn): description for description, fn in tasks}
+            for future in concurrent.futures.as_completed(futures):
+                description = futures[future]
+                with self._lock:
+                    try:
+                        future.result()
+                        self._status["completed"] += 1
+                    except Exception as e:
+                        logging.warning("Warm-up task failed (%s): %s", description, e)
+                        self._status["failed"] += 1
+                        self._status["errors"].append(f"{description}: {e}")
+        with self._lock:
+            self._status["state"] = "done"
+            self._status["finished_at"] = time.time()
+        print(f"Warm-up finished: {self._status['completed']} completed, {self._status['failed']} failed "
+              f"in {self._status['finished_at'] - self._status['started_at']:.1f}s")
+
+    def status(self) -> dict:
+        with self._lock:
+            status = dict(self._status, errors=list(self._status["errors"]))
+        status["progress"] = (status["completed"] + status["failed"]) / status["total"] if status["total"] else 0.0
+        return status
+
+
+_warmup_job = None
+
+def get_warmup_job():
+    """Get or create the warm-up job instance"""
+    global _warmup_job
+    if _warmup_job is None:
+        _warmup_job = WarmupJob()
+    return _warmup_job